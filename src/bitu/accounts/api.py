@@ -1,10 +1,18 @@
+import hashlib
+import json
+
 from rest_framework.permissions import DjangoModelPermissions
 from rest_framework import generics, status
 from rest_framework.response import Response
 from .models import SecurityToken
 from .serializers import SecurityTokenValidationSerializer, UserSerializer, SSHKeySerializer
 
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers, quote_etag
+from django.utils.http import parse_etags
+
+from keymanagement.helpers import ssh_keys_generation
+from keymanagement.models import SSHKey
 
 class SecurityTokenValidationAPI(generics.GenericAPIView):
     permission_classes = [DjangoModelPermissions]
@@ -28,6 +36,83 @@ class UserAPI(generics.RetrieveAPIView):
         return self.request.user
 
 
+class ViewModelPermissions(DjangoModelPermissions):
+    perms_map = {
+        **DjangoModelPermissions.perms_map,
+        'GET': ['%(app_label)s.view_%(model_name)s'],
+        'HEAD': ['%(app_label)s.view_%(model_name)s'],
+    }
+
+
+class SSHKeyExportAPI(generics.GenericAPIView):
+    """Stream the active SSH keys of all active users, or of the users given by one
+    or more user parameters, optionally limited to a single system.
+
+    The output parameter selects the format: authorized_keys (default), with a
+    comment line naming the user before the keys of each user, or jsonl, one
+    JSON object per key. Responses carry an ETag, derived from the SSH key
+    generation, clients sending it in If-None-Match get a 304 Not Modified
+    until a key is changed.
+    """
+    permission_classes = [ViewModelPermissions]
+    queryset = SSHKey.objects.filter(active=True, user__is_active=True)
+    formats = {
+        'authorized_keys': 'text/plain; charset=utf-8',
+        'jsonl': 'application/jsonl; charset=utf-8',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        users = self.request.query_params.getlist('user')
+        if users:
+            queryset = queryset.filter(user__username__in=users)
+        if self.request.query_params.get('system'):
+            queryset = queryset.filter(system=self.request.query_params['system'])
+        return queryset.order_by('user__username', 'pk').values_list(
+            'user__username', 'system', 'key_type', 'finger_print', 'ssh_public_key')
+
+    def get_etag(self, output):
+        generation = ssh_keys_generation()
+        if generation is None:
+            return None
+        # The same generation yields different content for different parameters.
+        params = sorted((k, v) for k in self.request.query_params for v in self.request.query_params.getlist(k))
+        digest = hashlib.sha1(json.dumps([output, params]).encode('utf8')).hexdigest()[:12]
+        return quote_etag(f'{generation}-{digest}')
+
+    def authorized_keys(self, rows):
+        username = None
+        for row in rows:
+            if row[0] != username:
+                username = row[0]
+                yield f'# {username}\n'
+            yield f'{row[4]}\n'
+
+    def jsonl(self, rows):
+        fields = ('user', 'system', 'type', 'finger_print', 'data')
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row))) + '\n'
+
+    def get(self, request):
+        output = request.query_params.get('output', 'authorized_keys')
+        if output not in self.formats:
+            return Response({'output': [f'Unsupported output format, use one of: {", ".join(self.formats)}']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        etag = self.get_etag(output)
+        if etag and etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        rows = self.get_queryset().iterator(chunk_size=2000)
+        response = StreamingHttpResponse(getattr(self, output)(rows), content_type=self.formats[output])
+        if etag:
+            response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
 class CreateSSHKey(generics.CreateAPIView, generics.DestroyAPIView, generics.UpdateAPIView):
     queryset = SSHKeySerializer.Meta.model
     serializer_class = SSHKeySerializer
@@ -8,7 +8,6 @@ from io import BytesIO
 from typing import Any
 from urllib.parse import quote as html_quote
 
-import bituldap
 import django_rq
 import pyotp
 import qrcode
@@ -19,6 +18,9 @@ from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from rest_framework.authtoken.models import Token as ABSToken
 
+from ldapbackend import directory, membership
+from permissions.rules import access_rules
+
 
 class User(AbstractUser):
     def __init__(self, *args, **kwargs):
@@ -28,12 +30,14 @@ class User(AbstractUser):
     @property
     def ldap_entry(self):
         if self.__ldap_user is None:
-            self.__ldap_user = bituldap.get_user(self.get_username())
+            self.__ldap_user = directory.get_user(self.get_username())
         return self.__ldap_user
 
     @property
-    def ldap_groups(self):
-        return bituldap.member_of(self.ldap_entry.entry_dn)
+    def ldap_group_dns(self) -> list[str]:
+        # Replaces ldap_groups, which returned LDAP entries, group names are
+        # available from the DNs using the rdn_value template filter.
+        return sorted(membership.group_dns(self.ldap_entry.entry_dn))
 
     @property
     def allow_api_usage(self):
@@ -61,7 +65,7 @@ class User(AbstractUser):
         account_manager_groups = set(account_manager_groups)
 
         # Get the DN of all groups the user is a member of.
-        groups = [entry.entry_dn for entry in bituldap.member_of(self.ldap_entry.entry_dn)]
+        groups = membership.group_dns(self.ldap_entry.entry_dn)
 
         # Check if the account manager group DN is present in the list of LDAP group
         # memberships.
@@ -70,12 +74,7 @@ class User(AbstractUser):
 
     @property
     def permission_manager(self):
-        for system, rule_sets in settings.ACCESS_REQUEST_RULES.items():
-            for key, rules in rule_sets.items():
-                for rule in rules:
-                    if self.get_username() in rule.get('managers', []):
-                        return True
-        return False
+        return access_rules().is_manager(self.get_username())
 
     @property
     def display_signed_in_as(self):
@@ -46,32 +46,20 @@ class UserSerializer(serializers.Serializer):
     def get_backends(self, obj):
         return list_backends(manage_ssh_keys=True)
 
-    def get_permissions(self, obj):
-        permissions = []
-        for permission in permission_set.existing_permissions(obj):
-            data = permission.__dict__
-            data['existing'] = True
-            data['description'] = permission.description_display.__str__()
-            data['status_display'] = permission.state_display
-            if permission.request:
-                data['request'] = permission.request.pk
-            else:
-                data['request'] = False
-            data.pop('user')
-            permissions.append(data)
-
-        for permission in permission_set.available_permissions(obj):
-            data = permission.__dict__
-            data['existing'] = False
-            data['description'] = permission.description_display.__str__()
-            data['status_display'] = permission.state_display
+    def _permission_data(self, permission, existing):
+        data = {k: v for k, v in permission.__dict__.items() if k != 'user' and not k.startswith('_')}
+        data['existing'] = existing
+        data['description'] = permission.description_display.__str__()
+        data['status_display'] = permission.state_display
+        # Backends load the latest request along with the permission.
+        request = permission.request
+        data['request'] = request.pk if request else False
+        return data
 
-            if permission.request:
-                data['request'] = permission.request.pk
-            else:
-                data['request'] = False
-            data.pop('user')
-            permissions.append(data)
+    def get_permissions(self, obj):
+        overview = permission_set.overview(obj)
+        permissions = [self._permission_data(p, True) for p in overview.existing]
+        permissions.extend(self._permission_data(p, False) for p in overview.available)
         return sorted(permissions, key=lambda d: d['name'])
 
     class Meta:
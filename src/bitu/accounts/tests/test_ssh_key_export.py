@@ -0,0 +1,94 @@
+import json
+
+from unittest.mock import Mock, patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User, Token
+from keymanagement.models import SSHKey
+from wikimedia.integrations.ldap import LDAP
+
+
+class SSHKeyExportAPITest(TestCase):
+    key1 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAINTXBZrJkodCzdfHkuKy2+/yPHLrMkkMYWfIuDGaJy8t Bitu ED25519 Test Key 1'  # noqa
+    key2 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIAkTVYhMVOooNQwfxURKnFYav/huLuSh3B+vFiLm4UrL Bitu ED25519 Test Key 3'  # noqa
+
+    def setUp(self) -> None:
+        self.user, _ = User.objects.get_or_create(username='rachel32')
+        self.other, _ = User.objects.get_or_create(username='ethan07')
+
+        self.api_user, _ = User.objects.get_or_create(username='api_user')
+        contenttype = ContentType.objects.get_for_model(SSHKey)
+        self.api_user.user_permissions.add(contenttype.permission_set.get(codename='view_sshkey'))
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.api_user).key)
+
+    def add_key(self, user, ssh_public_key, active=True):
+        key = SSHKey(user=user, ssh_public_key=ssh_public_key, system='ldapbackend', active=active)
+        key._skip_signal = True
+        key.save()
+        return key
+
+    def test_export(self):
+        url = reverse('accounts:api_ssh_export')
+        self.add_key(self.user, self.key1)
+        self.add_key(self.other, self.key2, active=False)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content).decode(), f'# rachel32\n{self.key1}\n')
+
+        # Keys of deactivated users are not exported.
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(b''.join(self.client.get(url).streaming_content), b'')
+        self.user.is_active = True
+        self.user.save()
+
+        response = self.client.get(url, {'output': 'jsonl', 'user': 'rachel32'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['user'], 'rachel32')
+        self.assertEqual(rows[0]['data'], self.key1)
+
+        self.assertEqual(self.client.get(url, {'output': 'pem'}).status_code, 400)
+
+        # Users without permission to view SSH keys are denied.
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        self.assertEqual(client.get(url).status_code, 403)
+
+    def test_etag(self):
+        url = reverse('accounts:api_ssh_export')
+        self.add_key(self.user, self.key1)
+
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(url, {'output': 'jsonl'})['ETag'], etag)
+
+        # Any change to a key results in a new generation, once committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_key(self.other, self.key2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_blocked_user(self):
+        url = reverse('accounts:api_ssh_export')
+        self.add_key(self.user, self.key1)
+        etag = self.client.get(url)['ETag']
+
+        # Blocking a user deactivates the account, clients holding the previous
+        # ETag must receive the export without the keys of the blocked user.
+        entry = {'dn': 'uid=rachel32,ou=people,dc=example,dc=org', 'attributes': {}}
+        with patch('bituldap.create_connection', return_value=(True, Mock(**{'modify.return_value': True}))), \
+                patch.object(LDAP, 'fetch_entry', return_value=entry), \
+                self.captureOnCommitCallbacks(execute=True):
+            LDAP().block_user(self.user.get_username())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'')
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from ldapbackend.tests import dummy_ldap
+from permissions.models import PermissionRequest
+
+
+class UserAPITest(TestCase):
+    keys = [f'cn={cn},ou=groups,dc=example,dc=org' for cn in ('NDA', 'ITS', 'db', 'staff', 'www')]
+    rules = {
+        'ldapbackend': {
+            key: [{
+                'module': 'permissions.validators.manager_approval',
+                'managers': ['wwaller'],
+                'count': 1
+            }] for key in keys
+        }
+    }
+
+    def setUp(self) -> None:
+        self.user, _ = User.objects.get_or_create(username='rachel32')
+        self.user.set_password('secret')
+        self.user.save()
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('accounts:user_api'))
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_constant_query_count(self, mock_connect):
+        self.client.login(username='rachel32', password='secret')
+        with self.settings(ACCESS_REQUEST_RULES=self.rules):
+            PermissionRequest.objects.create(user=self.user, system='ldapbackend', key=self.keys[0], comment='1')
+            data, queries = self._get()
+            request = {p['key']: p['request'] for p in data['permissions']}
+            self.assertTrue(request[self.keys[0]])
+            self.assertFalse(request[self.keys[1]])
+
+            for key in self.keys[1:]:
+                PermissionRequest.objects.create(user=self.user, system='ldapbackend', key=key, comment='2')
+            data, more_queries = self._get()
+            self.assertTrue(all(p['request'] for p in data['permissions']))
+            self.assertEqual(queries, more_queries)
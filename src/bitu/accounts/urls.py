@@ -7,7 +7,7 @@ from django.views.generic import TemplateView
 from django.contrib.auth.views import LogoutView
 
 
-from .api import SecurityTokenValidationAPI, UserAPI, CreateSSHKey
+from .api import SecurityTokenValidationAPI, SSHKeyExportAPI, UserAPI, CreateSSHKey
 
 from .views import (
     TokenCreateView,
@@ -40,6 +40,11 @@ if settings.ENABLE_2FA:
         path('2fa/disable/', login_required(TOTPDeleteView.as_view()), name='2fa_disable'),
     ])
 
+if settings.ENABLE_API:
+    urlpatterns.append(
+        path('api/keys/', SSHKeyExportAPI.as_view(), name='api_ssh_export'),
+    )
+
 if settings.ENABLE_2FA and settings.ENABLE_API:
     urlpatterns.append(
         path('api/totp/', SecurityTokenValidationAPI.as_view(), name='api_totp'),
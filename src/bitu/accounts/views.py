@@ -1,6 +1,4 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
-import bituldap
-
 from django.contrib import messages
 from django.core.exceptions import ImproperlyConfigured, PermissionDenied
 from django.forms import BaseModelForm
@@ -26,6 +24,7 @@ from .models import User, EmailUpdate, Token, SecurityToken
 from . import jobs, tokens
 
 from bitu.views import ObjectAccessRestrictMixin
+from ldapbackend import directory
 
 
 INTERNAL_EMAIL_UPDATE_SESSION_TOKEN = "_email_update_token"
@@ -157,9 +156,9 @@ class VerifyEmailView(FormView):
             #
             # Instead, assure that the only place that can set the user email is form_valid,
             # after verifying email ownership.
-            ldap_user = bituldap.get_user(user.get_username())
+            ldap_user = directory.get_user(user.get_username(), writable=True)
             ldap_user.mail = email
-            ldap_user.entry_commit_changes()
+            directory.commit(ldap_user)
 
             messages.success(self.request, _(
                 'Email address successfully updated. \
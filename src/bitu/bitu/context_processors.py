@@ -17,12 +17,9 @@ def permissions(request):
         'managed_permissions': False
     }
 
-    count = 0
-    if hasattr(settings, 'ACCESS_REQUEST_RULES') and settings.ACCESS_REQUEST_RULES:
-        from permissions.permission import permission_set
-        count = permission_set.get_pending(request.user).count()
+    from permissions.pending import pending_count
 
     return {
-        'pending_permissions': count,
+        'pending_permissions': pending_count(request.user),
         'managed_permissions': request.user.permission_manager
     }
@@ -1,5 +1,6 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
 from . import signals
 
 
@@ -10,3 +11,6 @@ class KeymanagementConfig(AppConfig):
     def ready(self) -> None:
         from .models import SSHKey
         post_save.connect(signals.update_ssh_key, SSHKey)
+        post_save.connect(signals.ssh_keys_changed, SSHKey)
+        post_delete.connect(signals.ssh_keys_changed, SSHKey)
+        pre_save.connect(signals.user_state_changed, get_user_model())
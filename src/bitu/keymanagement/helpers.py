@@ -1,16 +1,25 @@
 import base64
+import hashlib
 import logging
+import time
 
-from typing import NewType, TYPE_CHECKING
+from functools import cached_property, lru_cache
+from typing import NewType, Optional, TYPE_CHECKING
+
+import django_rq
 
 from django.conf import settings
 from django.utils.module_loading import import_string
+from redis.exceptions import RedisError
 
 from paramiko.dsskey import DSSKey
 from paramiko.ecdsakey import ECDSAKey
 from paramiko.ed25519key import Ed25519Key
 from paramiko.pkey import PKey, PublicBlob
 from paramiko.rsakey import RSAKey
+from paramiko.ssh_exception import SSHException
+from sshpubkeys import SSHKey as SSHPublicKey
+from sshpubkeys.exceptions import InvalidKeyError
 
 
 if TYPE_CHECKING:
@@ -29,6 +38,76 @@ def ssh_key_without_comment(ssh_key: str) -> str:
     return ' '.join(elements[0:2])
 
 
+class ParsedSSHKey():
+    """A public SSH key, decoded at most once.
+
+    Use parse_ssh_key() to get an instance, parsed keys are memoized per key string,
+    so that validators, forms, serializers and the model share the same object.
+    """
+
+    def __init__(self, ssh_key: str) -> None:
+        self.text = ssh_key.strip()
+        elements = self.text.split()
+
+        # Key type and base64 encoded key data, without comment or whitespace.
+        self.canonical = ' '.join(elements[0:2])
+        self.comment = ' '.join(elements[2:])
+        self.is_private = 'BEGIN RSA PRIVATE KEY' in ssh_key or 'BEGIN OPENSSH PRIVATE KEY' in ssh_key
+
+    @cached_property
+    def blob(self) -> Optional[PublicBlob]:
+        try:
+            return PublicBlob.from_string(self.text)
+        except (SSHException, ValueError):
+            return None
+
+    @cached_property
+    def _public_key(self) -> Optional[SSHPublicKey]:
+        # Not strict, key size requirements are enforced by ssh_key_validator().
+        obj = SSHPublicKey(strict=False)
+        try:
+            obj.parse(self.text)
+        except (InvalidKeyError, NotImplementedError):
+            return None
+        return obj
+
+    @property
+    def is_valid(self) -> bool:
+        return self.blob is not None
+
+    @property
+    def key_type(self) -> str:
+        return self.blob.key_type if self.blob else ''
+
+    @property
+    def bits(self) -> int:
+        return self._public_key.bits if self._public_key else 0
+
+    @cached_property
+    def finger_print(self) -> str:
+        return self._public_key.hash_sha512() if self._public_key else ''
+
+    @cached_property
+    def digest(self) -> str:
+        return hashlib.sha256(self.canonical.encode('utf8')).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def parse_ssh_key(ssh_key: str) -> ParsedSSHKey:
+    return ParsedSSHKey(ssh_key)
+
+
+def ssh_key_digest(ssh_key: str) -> str:
+    """SHA256 digest of the canonical form of a public SSH key, key type and
+    base64 encoded key data, ignoring comments and surrounding whitespace."""
+    return parse_ssh_key(ssh_key).digest
+
+
+def ssh_key_finger_print(ssh_key: str) -> str:
+    """SHA512 finger print of a public SSH key, empty if the key cannot be parsed."""
+    return parse_ssh_key(ssh_key).finger_print
+
+
 def ssh_key_string_to_object(ssh_key: str) -> PKey:
     sanitized_key_data = ssh_key.strip()
     blob = PublicBlob.from_string(sanitized_key_data)
@@ -52,16 +131,185 @@ def key_type_from_str(ssh_key) -> str:
     return blob.key_type
 
 
+def key_management_systems() -> list[str]:
+    return [k for k, v in settings.BITU_SUB_SYSTEMS.items() if v.get('manage_ssh_keys', False)]
+
+
 def load_ssh_key(user: 'User'):
     """load ssh keys from various subsystems for the given user
 
     Args:
         user (User): Django user object
     """
-    for system in settings.BITU_SUB_SYSTEMS:
+    from .models import SSHKeySync
+
+    # Same systems as refresh_ssh_keys(), so sync records match the staleness checks.
+    for system in key_management_systems():
         try:
             import_string(f'{system}.jobs.load_ssh_key')(user)
+            SSHKeySync.mark(user, system)
         except ImportError:
             logger.debug(f'backend does not support key management, system:{system}')
         except Exception as e:
             logger.error(f'error importing ssh keys, system:{system}, user: {user.get_username()}, exception: {e}')
+
+
+def _refresh_key(user: 'User', system: str) -> str:
+    return f'keymanagement:refresh:{user.pk}:{system}'
+
+
+def _claim_refresh(user: 'User', system: str, timeout: int) -> bool:
+    # Only one refresh per user and system is queued at a time, until the
+    # refresh completes or the timeout expires.
+    try:
+        return bool(django_rq.get_connection('default').set(_refresh_key(user, system), 1, nx=True, ex=timeout))
+    except RedisError:
+        return True
+
+
+def release_refresh(user: 'User', system: str) -> None:
+    try:
+        django_rq.get_connection('default').delete(_refresh_key(user, system))
+    except RedisError:
+        pass
+
+
+def refresh_ssh_keys(user: 'User', force: bool = False) -> list[str]:
+    """Queue an import of SSH keys, for each subsystem where the previous import is stale.
+
+    Args:
+        user (User): Django user object
+        force (bool, optional): Queue an import regardless of the age of the previous
+                                import. Defaults to False.
+
+    Returns:
+        list[str]: Subsystems for which an import was queued.
+    """
+    from .jobs import load_ssh_key as load_ssh_key_job
+    from .models import SSHKeySync, sync_max_age
+
+    synchronized = {s.system: s for s in SSHKeySync.objects.filter(user=user)}
+    queued = []
+    for system in key_management_systems():
+        # Pending changes are pushed first, the synchronization also imports.
+        if sync_pending(user, system):
+            continue
+        sync = synchronized.get(system)
+        if not force and sync and not sync.is_stale:
+            continue
+        if not force and not _claim_refresh(user, system, sync_max_age()):
+            continue
+
+        try:
+            load_ssh_key_job.delay(user, system)
+            queued.append(system)
+        except Exception as e:
+            logger.error(f'error queueing ssh key import, system:{system}, user: {user.get_username()}, exception: {e}')
+    return queued
+
+
+def _sync_key(user: 'User', system: str) -> str:
+    return f'keymanagement:sync:{user.pk}:{system}'
+
+
+def _syncing_key(user: 'User', system: str) -> str:
+    return f'keymanagement:syncing:{user.pk}:{system}'
+
+
+def start_sync(user: 'User', system: str) -> None:
+    """Release the pending marker and flag the synchronization as running,
+    so that changes made while the job is running queue a new job."""
+    try:
+        pipe = django_rq.get_connection('default').pipeline()
+        pipe.delete(_sync_key(user, system))
+        pipe.set(_syncing_key(user, system), 1, ex=300)
+        pipe.execute()
+    except RedisError:
+        pass
+
+
+def finish_sync(user: 'User', system: str) -> None:
+    # Only clears the running flag, a job queued meanwhile keeps its marker.
+    try:
+        django_rq.get_connection('default').delete(_syncing_key(user, system))
+    except RedisError:
+        pass
+
+
+def release_sync(user: 'User', system: str) -> None:
+    try:
+        django_rq.get_connection('default').delete(_sync_key(user, system), _syncing_key(user, system))
+    except RedisError:
+        pass
+
+
+def sync_pending(user: 'User', system: str) -> bool:
+    """True if a synchronization of SSH keys is queued or running. Imports
+    from the subsystem must wait, or keys not yet pushed are deactivated."""
+    try:
+        return bool(django_rq.get_connection('default').exists(_sync_key(user, system), _syncing_key(user, system)))
+    except RedisError:
+        return False
+
+
+def schedule_sync(user: 'User', system: str) -> bool:
+    """Queue a synchronization of SSH keys for a user with a subsystem.
+
+    Changes made while a job is queued, but not yet started, are coalesced
+    into that job.
+
+    Args:
+        user (User): Django user object
+        system (str): Name of the subsystem, e.g. ldapbackend
+
+    Returns:
+        bool: True if a new job was queued, False if one is already pending.
+    """
+    from .jobs import syncronize_ssh_keys
+
+    try:
+        # The pending marker is released as soon as the job starts, it expires
+        # in case the job is lost.
+        if not django_rq.get_connection('default').set(_sync_key(user, system), 1, nx=True, ex=300):
+            return False
+    except RedisError as e:
+        logger.warning(f'unable to coalesce ssh key synchronization, user: {user.get_username()}, exception: {e}')
+
+    syncronize_ssh_keys.delay(user, system)
+    return True
+
+
+GENERATION_KEY = 'keymanagement:generation'
+
+
+def ssh_keys_generation() -> Optional[int]:
+    """Generation of the SSH keys, which changes whenever any key is saved or
+    deleted. Used as ETag for the SSH key export API.
+
+    Returns:
+        Optional[int]: Current generation, None if it is unavailable.
+    """
+    try:
+        redis = django_rq.get_connection('default')
+        generation = redis.get(GENERATION_KEY)
+        if generation is None:
+            # Seed from the clock, so that a lost counter does not repeat a
+            # generation previously handed out to clients.
+            redis.set(GENERATION_KEY, time.time_ns() // 1000, nx=True)
+            generation = redis.get(GENERATION_KEY)
+    except RedisError as e:
+        logger.warning(f'ssh key generation unavailable, exception: {e}')
+        return None
+    return int(generation)
+
+
+def bump_ssh_keys_generation() -> None:
+    try:
+        redis = django_rq.get_connection('default')
+        pipe = redis.pipeline()
+        pipe.set(GENERATION_KEY, time.time_ns() // 1000, nx=True)
+        pipe.incr(GENERATION_KEY)
+        pipe.execute()
+    except RedisError as e:
+        # Clients may receive a 304 Not Modified for a stale export, until the next change.
+        logger.error(f'failed to update ssh key generation, exception: {e}')
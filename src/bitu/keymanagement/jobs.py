@@ -0,0 +1,54 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import logging
+
+from typing import NewType, TYPE_CHECKING
+
+from django.utils.module_loading import import_string
+from django_rq import job
+
+from .helpers import finish_sync, release_refresh, start_sync, sync_pending
+from .models import SSHKeySync
+
+
+if TYPE_CHECKING:
+    from django.contrib.auth import get_user_model
+    User = NewType('User', get_user_model())
+
+logger = logging.getLogger('bitu')
+
+
+@job
+def load_ssh_key(user: 'User', system: str):
+    """Import SSH keys from a single subsystem and record the time of the import.
+
+    Args:
+        user (User): Django user object
+        system (str): Name of the subsystem, e.g. ldapbackend
+    """
+    try:
+        # A synchronization was queued after this import, keys uploaded but not
+        # yet pushed would be deactivated, as they are missing from the subsystem.
+        if sync_pending(user, system):
+            return
+        import_string(f'{system}.jobs.load_ssh_key')(user)
+        SSHKeySync.mark(user, system)
+    finally:
+        release_refresh(user, system)
+
+
+@job
+def syncronize_ssh_keys(user: 'User', system: str):
+    """Synchronize all pending SSH key changes for a user with a subsystem.
+
+    Args:
+        user (User): Django user object
+        system (str): Name of the subsystem, e.g. ldapbackend
+    """
+    # Release before synchronizing, so that changes made while the job
+    # is running are picked up by a new job.
+    start_sync(user, system)
+    try:
+        import_string(f'{system}.jobs.syncronize_ssh_keys')(user)
+        SSHKeySync.mark(user, system)
+    finally:
+        finish_sync(user, system)
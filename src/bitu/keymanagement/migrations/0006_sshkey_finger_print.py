@@ -0,0 +1,50 @@
+import base64
+import binascii
+import hashlib
+
+from django.db import migrations, models
+
+
+def ssh_key_finger_print(ssh_key: str) -> str:
+    # Frozen copy of keymanagement.helpers.ssh_key_finger_print(), the SHA512
+    # finger print as computed by sshpubkeys, empty if the key cannot be parsed.
+    elements = ssh_key.split()
+    if len(elements) < 2:
+        return ''
+
+    try:
+        data = base64.b64decode(elements[1], validate=True)
+    except (binascii.Error, ValueError):
+        return ''
+
+    # The key data starts with the length prefixed key type.
+    length = int.from_bytes(data[:4], 'big')
+    if data[4:4 + length] != elements[0].encode('utf8'):
+        return ''
+    return 'SHA512:' + base64.b64encode(hashlib.sha512(data).digest()).decode('utf8').replace('=', '')
+
+
+def backfill_finger_prints(apps, schema_editor):
+    SSHKey = apps.get_model('keymanagement', 'SSHKey')
+
+    keys = []
+    for key in SSHKey.objects.only('pk', 'ssh_public_key').iterator():
+        key.finger_print = ssh_key_finger_print(key.ssh_public_key)
+        keys.append(key)
+    SSHKey.objects.bulk_update(keys, ['finger_print'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('keymanagement', '0005_alter_sshkey_key_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sshkey',
+            name='finger_print',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=128),
+        ),
+        migrations.RunPython(backfill_finger_prints, migrations.RunPython.noop),
+    ]
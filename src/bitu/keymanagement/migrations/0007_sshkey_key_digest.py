@@ -0,0 +1,52 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def key_digest(ssh_key: str) -> str:
+    # Frozen copy of keymanagement.helpers.ssh_key_digest(), SHA256 of the key
+    # type and base64 encoded key data.
+    return hashlib.sha256(' '.join(ssh_key.split()[0:2]).encode('utf8')).hexdigest()
+
+
+def backfill_key_digests(apps, schema_editor):
+    SSHKey = apps.get_model('keymanagement', 'SSHKey')
+
+    # Keys uploaded before duplicate detection was exact may share a digest, e.g.
+    # differing only in comment. Those can not be resolved automatically, as the
+    # keys may belong to different users, the migration is aborted instead.
+    keys = {}
+    conflicts = []
+    for key in SSHKey.objects.only('pk', 'user__username', 'ssh_public_key').select_related('user').order_by('pk'):
+        key.key_digest = key_digest(key.ssh_public_key)
+        original = keys.setdefault(key.key_digest, key)
+        if original is not key:
+            conflicts.append(f'key {key.pk} (user: {key.user.username}) duplicates '
+                             f'key {original.pk} (user: {original.user.username})')
+
+    if conflicts:
+        raise RuntimeError('Duplicate SSH keys found, delete or merge the duplicates and rerun the migration:\n'
+                           + '\n'.join(conflicts))
+
+    SSHKey.objects.bulk_update(keys.values(), ['key_digest'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('keymanagement', '0006_sshkey_finger_print'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sshkey',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_key_digests, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sshkey',
+            name='key_digest',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
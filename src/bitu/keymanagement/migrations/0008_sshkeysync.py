@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('keymanagement', '0007_sshkey_key_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SSHKeySync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('system', models.CharField(max_length=256)),
+                ('synchronized', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ssh_key_syncs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sshkeysync',
+            constraint=models.UniqueConstraint(fields=('user', 'system'), name='unique_ssh_key_sync'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('keymanagement', '0008_sshkeysync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sshkey',
+            index=models.Index(fields=['active', 'user'], name='sshkey_active_user_idx'),
+        ),
+    ]
@@ -1,11 +1,12 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from sshpubkeys import SSHKey as SSHPublicKey
-from sshpubkeys.exceptions import InvalidKeyError
 
-from .helpers import key_type_from_str, ssh_key_string_to_object
+from .helpers import parse_ssh_key, ssh_key_finger_print
 from .validators import ssh_key_validator, ssh_key_usage_validator
 
 
@@ -35,6 +36,8 @@ class SSHKey(models.Model):
     active = models.BooleanField(default=False)
     key_type = models.CharField(max_length=64, default='', null=True)
     key_size = models.IntegerField(default=0)
+    finger_print = models.CharField(max_length=128, default='', blank=True, db_index=True, editable=False)
+    key_digest = models.CharField(max_length=64, unique=True, null=True, editable=False)
 
     # Allow users to indicte that signals should not be processed.
     # Syncronisation with backend can result in further calls to the
@@ -47,13 +50,12 @@ class SSHKey(models.Model):
 
     def clean(self):
         self.ssh_public_key = self.ssh_public_key.strip()
-        obj: SSHPublicKey = SSHPublicKey(keydata=self.ssh_public_key)
-        try:
-            obj.parse()
-            self.key_size = obj.bits
-            self.key_type = obj.key_type.decode('utf8')
-        except (InvalidKeyError, NotImplementedError):
-            pass
+        key = parse_ssh_key(self.ssh_public_key)
+        self.key_digest = key.digest
+        self.finger_print = key.finger_print
+        if key.finger_print:
+            self.key_size = key.bits
+            self.key_type = key.key_type
 
     @property
     def key_as_byte_string(self):
@@ -70,13 +72,11 @@ class SSHKey(models.Model):
         return short_form if len(short_form) < len(self.ssh_public_key) else self.ssh_public_key
 
     def get_finger_print(self) -> str:
-        obj = SSHPublicKey(keydata=self.ssh_public_key)
-
-        try:
-            obj.parse()
-            return obj.hash_sha512()
-        except Exception:
-            return ''
+        # The finger print is stored by clean(), only keys which have
+        # not yet been cleaned or saved need to be parsed.
+        if not self.finger_print:
+            self.finger_print = ssh_key_finger_print(self.ssh_public_key)
+        return self.finger_print
 
     def __str__(self) -> str:
         return self.get_display()
@@ -87,3 +87,40 @@ class SSHKey(models.Model):
                 fields=['system', 'ssh_public_key', 'active'],
                 name='unique_active_key'
             ),]
+        indexes = [
+            models.Index(fields=['active', 'user'], name='sshkey_active_user_idx'),
+        ]
+
+
+class SSHKeySync(models.Model):
+    """Time of the last successful import of SSH keys for a user from a system."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ssh_key_syncs')
+    system = models.CharField(max_length=256)
+    synchronized = models.DateTimeField()
+
+    @classmethod
+    def mark(cls, user, system: str) -> None:
+        cls.objects.update_or_create(user=user, system=system, defaults={'synchronized': timezone.now()})
+
+    @property
+    def is_stale(self) -> bool:
+        return timezone.now() - self.synchronized > timedelta(seconds=sync_max_age())
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'system'],
+                name='unique_ssh_key_sync'
+            ),]
+
+
+def sync_max_age() -> int:
+    """Seconds before SSH keys imported from a system are considered stale.
+
+    .. code-block:: python
+
+       BITU_SSH_KEY_SYNC = {
+         'max_age': 300,
+       }
+    """
+    return getattr(settings, 'BITU_SSH_KEY_SYNC', {}).get('max_age', 300)
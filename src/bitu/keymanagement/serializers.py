@@ -4,7 +4,7 @@ from rest_framework import serializers
 from bitu.helpers import list_backends
 
 from .models import SSHKey
-from .helpers import ssh_key_string_to_object, key_type_from_str
+from .helpers import parse_ssh_key
 from .validators import ssh_key_validator, ssh_key_usage_validator
 
 
@@ -22,10 +22,7 @@ class SSHKeySerializer(serializers.Serializer):
     comment = serializers.CharField(read_only=True)
 
     def validate_data(self, data):
-        try:
-            obj = key_type_from_str(data)
-            key_type_from_str(data)
-        except:
+        if not parse_ssh_key(data).is_valid:
             raise serializers.ValidationError("Invalid SSH key")
         return data
 
@@ -37,9 +34,9 @@ class SSHKeySerializer(serializers.Serializer):
 
 
     def create(self, validated_data):
-        key_object = ssh_key_string_to_object(validated_data['ssh_public_key'])
-        validated_data['key_type'] = key_type_from_str(validated_data['ssh_public_key'])
-        validated_data['key_size'] = key_object.get_bits()
+        key = parse_ssh_key(validated_data['ssh_public_key'])
+        validated_data['key_type'] = key.key_type
+        validated_data['key_size'] = key.bits
 
         if 'system' in validated_data and validated_data['system']:
             validated_data['active'] = True
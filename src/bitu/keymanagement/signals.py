@@ -3,8 +3,11 @@ import logging
 from typing import TYPE_CHECKING
 
 from django.conf import settings
+from django.db import transaction
 from django.utils.module_loading import import_string
 
+from .helpers import bump_ssh_keys_generation, schedule_sync
+
 
 if TYPE_CHECKING:
     from .models import SSHKey
@@ -18,12 +21,11 @@ def update_ssh_key(sender, instance: 'SSHKey', created: bool, **kwargs):
     if instance._skip_signal:
         return
 
-    # If a system is defined, syncronize with the appropriate backend.
+    # If a system is defined, syncronize with the appropriate backend. Multiple
+    # changes for the same user are coalesced into a single job.
     if instance.system:
         try:
-            import_string(f'{instance.system}.jobs.push_ssh_key')(instance)
-            import_string(f'{instance.system}.jobs.remove_ssh_key')(instance)
-            import_string(f'{instance.system}.jobs.load_ssh_key')(instance.user)
+            schedule_sync(instance.user, instance.system)
         except Exception as e:
             logger.warning(f'Error calling ssh key handler, \
                            instance: {instance.system}, user: {instance.user}, \
@@ -39,3 +41,21 @@ def update_ssh_key(sender, instance: 'SSHKey', created: bool, **kwargs):
                 import_string(f'{system}.helpers.check_ssh_key')(instance)
             except Exception:
                 logger.info(f'ssh key configured tried to load unknown backend: {system}')
+
+
+def ssh_keys_changed(sender, **kwargs):
+    # Invalidate exported SSH keys, regardless of _skip_signal. The generation
+    # is bumped once committed, so clients can not cache the previous keys
+    # under the new ETag.
+    transaction.on_commit(bump_ssh_keys_generation)
+
+
+def user_state_changed(sender, instance, update_fields=None, **kwargs):
+    # Keys of inactive users are not exported, activating or deactivating a
+    # user must invalidate exported SSH keys as well.
+    if instance.pk is None or (update_fields is not None and 'is_active' not in update_fields):
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+    if previous is not None and previous != instance.is_active:
+        transaction.on_commit(bump_ssh_keys_generation)
@@ -5,8 +5,8 @@ from django.test import Client
 from django.urls import reverse
 
 from accounts.models import User
-from keymanagement import helpers
-from keymanagement.models import SSHKey
+from keymanagement import helpers, jobs
+from keymanagement.models import SSHKey, SSHKeySync
 
 from ldapbackend.tests import dummy_ldap
 
@@ -73,6 +73,67 @@ class ValidatorTest(TestCase):
         key = SSHKey.objects.filter(user=self.user).get(comment='Whitespace Test')
         self.assertEqual(key.comment, 'Whitespace Test')
 
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_list_view_sync(self, mock_connect):
+        list_url = reverse('keymanagement:list')
+        with patch('ldapbackend.jobs.load_ssh_key') as load_ssh_key:
+            response = self.client.get(list_url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(load_ssh_key.call_count, 1)
+            self.assertContains(response, 'Keys last synchronized')
+
+            # Keys were just synchronized, serve them from the database.
+            self.client.get(list_url)
+            self.assertEqual(load_ssh_key.call_count, 1)
+
+            response = self.client.post(reverse('keymanagement:refresh'))
+            self.assertRedirects(response, list_url)
+            self.assertEqual(load_ssh_key.call_count, 2)
+
+        self.assertEqual(SSHKeySync.objects.filter(user=self.user, system='ldapbackend').count(), 1)
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_upload_then_refresh(self, mock_connect):
+        key1 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIAkTVYhMVOooNQwfxURKnFYav/huLuSh3B+vFiLm4UrL Bitu ED25519 Test Key 3'  # noqa
+        helpers.release_sync(self.user, 'ldapbackend')
+
+        # The upload is not yet pushed to LDAP when the key list is rendered.
+        with patch('keymanagement.jobs.syncronize_ssh_keys') as syncronize_ssh_keys:
+            response = self.client.post(reverse('keymanagement:create'),
+                                        {'comment': 'Upload', 'ssh_public_key': key1, 'system': 'ldapbackend'})
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(syncronize_ssh_keys.delay.call_count, 1)
+
+            with patch('ldapbackend.jobs.load_ssh_key') as load_ssh_key:
+                self.client.get(reverse('keymanagement:list'))
+                self.client.post(reverse('keymanagement:refresh'))
+                load_ssh_key.assert_not_called()
+
+        key = SSHKey.objects.get(user=self.user, comment='Upload')
+        self.assertTrue(key.active)
+
+        jobs.syncronize_ssh_keys(self.user, 'ldapbackend')
+        self.assertFalse(helpers.sync_pending(self.user, 'ldapbackend'))
+        key.refresh_from_db()
+        self.assertTrue(key.active)
+        self.assertEqual(key.system, 'ldapbackend')
+
+    def test_coalesce_sync(self):
+        key1 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAINTXBZrJkodCzdfHkuKy2+/yPHLrMkkMYWfIuDGaJy8t Bitu ED25519 Test Key 1'  # noqa
+        key2 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIAkTVYhMVOooNQwfxURKnFYav/huLuSh3B+vFiLm4UrL Bitu ED25519 Test Key 3'  # noqa
+        helpers.release_sync(self.user, 'ldapbackend')
+
+        with patch('keymanagement.jobs.syncronize_ssh_keys') as syncronize_ssh_keys:
+            SSHKey.objects.create(user=self.user, ssh_public_key=key1, system='ldapbackend', active=True)
+            SSHKey.objects.create(user=self.user, ssh_public_key=key2, system='ldapbackend', active=True)
+            self.assertEqual(syncronize_ssh_keys.delay.call_count, 1)
+
+            # Once the job starts, new changes queue a new job.
+            helpers.release_sync(self.user, 'ldapbackend')
+            self.user.ssh_keys.first().save()
+            self.assertEqual(syncronize_ssh_keys.delay.call_count, 2)
+        helpers.release_sync(self.user, 'ldapbackend')
+
 
 class SSHKeyHelperTest(TestCase):
     def test_no_comment(self):
@@ -89,3 +150,38 @@ class SSHKeyHelperTest(TestCase):
 
         self.assertIsInstance(obj1, Ed25519Key)
         self.assertIsInstance(obj2, RSAKey)
+
+    def test_finger_print(self):
+        key1 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAINTXBZrJkodCzdfHkuKy2+/yPHLrMkkMYWfIuDGaJy8t Bitu ED25519 Test Key 1'  # noqa
+        user, _ = User.objects.get_or_create(username='rachel32')
+        key = SSHKey(user=user, ssh_public_key=f' {key1}\n', system='')
+        key._skip_signal = True
+        key.save()
+
+        self.assertTrue(key.finger_print.startswith('SHA512:'))
+        self.assertEqual(key.finger_print, helpers.ssh_key_finger_print(key1))
+        self.assertEqual(SSHKey.objects.get(finger_print=key.finger_print), key)
+        self.assertEqual(helpers.ssh_key_finger_print('invalid'), '')
+
+    def test_key_digest(self):
+        key1 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAINTXBZrJkodCzdfHkuKy2+/yPHLrMkkMYWfIuDGaJy8t Bitu ED25519 Test Key 1'  # noqa
+        key2 = '  ssh-ed25519  AAAAC3NzaC1lZDI1NTE5AAAAINTXBZrJkodCzdfHkuKy2+/yPHLrMkkMYWfIuDGaJy8t Other comment\n'  # noqa
+        key3 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIAkTVYhMVOooNQwfxURKnFYav/huLuSh3B+vFiLm4UrL Bitu ED25519 Test Key 1'  # noqa
+        self.assertEqual(helpers.ssh_key_digest(key1), helpers.ssh_key_digest(key2))
+        self.assertNotEqual(helpers.ssh_key_digest(key1), helpers.ssh_key_digest(key3))
+
+    def test_parse_ssh_key(self):
+        key1 = 'ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAINTXBZrJkodCzdfHkuKy2+/yPHLrMkkMYWfIuDGaJy8t Bitu ED25519 Test Key 1'  # noqa
+        key = helpers.parse_ssh_key(key1)
+        self.assertIs(key, helpers.parse_ssh_key(key1))
+        self.assertTrue(key.is_valid)
+        self.assertEqual(key.key_type, 'ssh-ed25519')
+        self.assertEqual(key.bits, 256)
+        self.assertEqual(key.canonical, key1[0:80])
+        self.assertEqual(key.comment, 'Bitu ED25519 Test Key 1')
+        self.assertEqual(key.finger_print, helpers.ssh_key_finger_print(key1))
+
+        invalid = helpers.parse_ssh_key('ssh-ed25519 invalid')
+        self.assertFalse(invalid.is_valid)
+        self.assertEqual(invalid.bits, 0)
+        self.assertEqual(invalid.finger_print, '')
@@ -9,6 +9,7 @@ from .views import (SSHKeyActivateView,
                     SSHKeyDeactiveView,
                     SSHKeyDeleteView,
                     SSHKeyListView,
+                    SSHKeyRefreshView,
                     )
 
 app_name = 'keymanagement'
@@ -17,6 +18,7 @@ urlpatterns = [
     path('delete/<int:pk>/', login_required(SSHKeyDeleteView.as_view()), name='delete'),
     path('activate/<int:pk>/', login_required(SSHKeyActivateView.as_view()), name='activate'),
     path('deactivate/<int:pk>/', login_required(SSHKeyDeactiveView.as_view()), name='deactivate'),
+    path('refresh/', login_required(SSHKeyRefreshView.as_view()), name='refresh'),
     path('', login_required(SSHKeyListView.as_view()), name='list'),
     path('list/', login_required(TemplateView.as_view(template_name="keymanagement/sshkey_app.html")), name="list_keys")
 ]
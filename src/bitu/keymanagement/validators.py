@@ -1,38 +1,28 @@
+from django.apps import apps
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from paramiko.pkey import PublicBlob
-from paramiko.ssh_exception import SSHException
 
-from .helpers import ssh_key_string_to_object, ssh_key_without_comment
-
-
-User = get_user_model()
+from .helpers import parse_ssh_key
 
 
 def ssh_key_validator(ssh_key):
-    if 'BEGIN RSA PRIVATE KEY' in ssh_key or 'BEGIN OPENSSH PRIVATE KEY' in ssh_key:
+    key = parse_ssh_key(ssh_key)
+    if key.is_private:
         raise ValidationError(_('This is a private key. Private keys should never be shared or uploaded anywhere.'))
-    try:
-        pkey: PublicBlob = PublicBlob.from_string(ssh_key)
-    except (SSHException, ValueError):
+    if not key.is_valid:
         raise ValidationError(_('Invalid key. Input was not a valid public SSH key.'))
     # If no special rules are configured, allow all valid keys.
     allowed_key_types = getattr(settings, 'BITU_SSH_KEY_VALIDATOR', {}).get('allowed_key_type', {})
     if not allowed_key_types:
         return
-    if pkey.key_type not in allowed_key_types.keys():
+    if key.key_type not in allowed_key_types.keys():
         key_names = ','.join(allowed_key_types.keys())
-        raise ValidationError(f'Key type {pkey.key_type} is unsupported. Supported keys are: {key_names}')
-    key_type = allowed_key_types[pkey.key_type]
-    if pkey.key_type == 'ssh-rsa' and 'min_key_size' in key_type:
+        raise ValidationError(f'Key type {key.key_type} is unsupported. Supported keys are: {key_names}')
+    key_type = allowed_key_types[key.key_type]
+    if key.key_type == 'ssh-rsa' and 'min_key_size' in key_type:
         required_key_size = key_type['min_key_size']
-        # Split up the SSH key to remove type and comment at the front and end.
-        # base64 decode and parse to RSAKey constructor as data. Then get number
-        # of bits / key size from RSAKey object.
-        obj = ssh_key_string_to_object(ssh_key)
-        key_size = obj.get_bits()
+        key_size = key.bits
         if key_size < required_key_size:
             raise ValidationError(_(f'Minimum key size for SSH keys of the type: rsa is {required_key_size}, \
                                   upload key was: {key_size}'))
@@ -40,8 +30,9 @@ def ssh_key_validator(ssh_key):
 
 def ssh_key_usage_validator(ssh_key):
     # Check that another key, but with a different comment, doesn't already exists.
-    # Access the SSH keys via the User class, to avoid creating a circular import
-    if User.objects.filter(ssh_keys__ssh_public_key__istartswith=ssh_key_without_comment(ssh_key)).count():
+    # Look up the model via the app registry, to avoid creating a circular import.
+    SSHKey = apps.get_model('keymanagement', 'SSHKey')
+    if SSHKey.objects.filter(key_digest=parse_ssh_key(ssh_key).digest).exists():
         raise ValidationError(_('SSH key already exists'))
 
 
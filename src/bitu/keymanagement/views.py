@@ -2,6 +2,7 @@ from typing import Any
 
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
@@ -9,9 +10,8 @@ from django.views.generic.list import ListView
 from django.views.generic.base import View
 
 from .forms import SSHKeyCreateForm, SSHKeyActivateFormSingle
-from .helpers import ssh_key_string_to_object, key_type_from_str
-from .models import SSHKey
-from .helpers import load_ssh_key
+from .helpers import parse_ssh_key, refresh_ssh_keys
+from .models import SSHKey, SSHKeySync
 
 
 class SSHKeyAccessRestrict(View):
@@ -35,9 +35,24 @@ class SSHKeyListView(ListView):
     model = SSHKey
 
     def get_queryset(self):
-        load_ssh_key(self.request.user)
+        # Serve keys from the database, importing from the subsystems in the background
+        # if the previous import is too old.
+        refresh_ssh_keys(self.request.user)
         return SSHKey.objects.filter(user=self.request.user).order_by('-active', 'ssh_public_key')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        syncs = SSHKeySync.objects.filter(user=self.request.user)
+        context['synchronized'] = min([s.synchronized for s in syncs], default=None)
+        return context
+
+
+class SSHKeyRefreshView(View):
+    def post(self, request, *args, **kwargs):
+        refresh_ssh_keys(request.user, force=True)
+        messages.add_message(request, messages.INFO, _('SSH keys are being synchronized, this may take a moment.'))
+        return redirect('keymanagement:list')
+
 
 class SSHKeyCreateView(CreateView):
     model = SSHKey
@@ -50,11 +65,11 @@ class SSHKeyCreateView(CreateView):
         return initial
 
     def form_valid(self, form):
-        key_object = ssh_key_string_to_object(form.instance.ssh_public_key)
+        key = parse_ssh_key(form.instance.ssh_public_key)
         form.instance.user = self.request.user
-        form.instance.ssh_public_key = form.instance.ssh_public_key.strip()
-        form.instance.key_type = key_type_from_str(form.instance.ssh_public_key)
-        form.instance.key_size = key_object.get_bits()
+        form.instance.ssh_public_key = key.text
+        form.instance.key_type = key.key_type
+        form.instance.key_size = key.bits
 
         if form.instance.system:
             form.instance.active = True
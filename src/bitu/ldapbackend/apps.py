@@ -7,6 +7,8 @@ from .signals import create_user
 from django.contrib.auth import get_user_model
 from django.db.models.signals import post_save
 
+from . import pool
+
 
 logger = logging.getLogger('bitu')
 
@@ -16,6 +18,10 @@ class LdapConfig(AppConfig):
     name = 'ldapbackend'
 
     def ready(self) -> None:
+        # Connection pooling applies to all users of Bitu-LDAP, not just
+        # the ldapbackend, so enable it before checking the backend configuration.
+        pool.install()
+
         if not hasattr(settings, 'LDAP_USER_CONF'):
             logger.warning('ldap backend not configured.')
             return
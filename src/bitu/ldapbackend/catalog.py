@@ -0,0 +1,178 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Catalog of the LDAP groups which can be requested as permissions.
+
+Listing permissions requires the cn, owner and description of every group
+configured in ACCESS_REQUEST_RULES. When enabled the catalog is cached, both
+in the current process and in the Redis instance used by RQ, so rendering
+permission pages does not search LDAP:
+
+.. code-block:: python
+
+   BITU_LDAP = {
+     ...
+     'group_catalog_ttl': 300,  # Seconds, 0 disables the catalog cache.
+   }
+
+Once the catalog is older than group_catalog_ttl seconds, the cached copy is
+still served, while a refresh is queued as an RQ job. The catalog is only
+read from LDAP directly if it has never been built, or if the configured
+groups have changed. Group memberships are not part of the catalog, granting
+permissions does not invalidate it.
+"""
+import logging
+import pickle
+import threading
+import time
+
+from typing import Optional
+
+import bituldap
+import django_rq
+
+from django.conf import settings
+from ldap3 import BASE
+from redis.exceptions import RedisError
+
+from permissions.rules import access_rules
+
+from .directory import CachedEntry
+
+
+logger = logging.getLogger('bitu')
+
+CATALOG_KEY = 'ldap:groups:catalog'
+SCHEDULED_KEY = 'ldap:groups:scheduled'
+ATTRIBUTES = ['cn', 'owner', 'description']
+
+# Catalog held by the current process, shared by all threads.
+_catalog: dict = {}
+_lock = threading.Lock()
+
+
+def _ttl() -> int:
+    return getattr(settings, 'BITU_LDAP', {}).get('group_catalog_ttl', 0)
+
+
+def enabled() -> bool:
+    return _ttl() > 0
+
+
+def _configured() -> tuple[str, ...]:
+    return tuple(access_rules().keys('ldapbackend'))
+
+
+def load(dns: tuple[str, ...]) -> dict[str, CachedEntry]:
+    """Read the given groups from LDAP, using a single connection.
+
+    Args:
+        dns (tuple[str, ...]): Group DNs
+
+    Returns:
+        dict[str, CachedEntry]: Group entries, by the requested DN, which may differ
+                                in case or spacing from the DN returned by LDAP.
+                                Groups not found are left out.
+    """
+    bound, connection = bituldap.create_connection()
+    if not bound:
+        logger.error('ldap group catalog refresh failed, unable to bind')
+        return {}
+
+    entries = {}
+    for dn in dns:
+        if not connection.search(dn, '(cn=*)', BASE, attributes=ATTRIBUTES):
+            continue
+        for entry in connection.entries:
+            entries[dn] = CachedEntry.from_entry(entry)
+    return entries
+
+
+def _store(data: dict) -> None:
+    global _catalog
+    with _lock:
+        _catalog = data
+
+
+def refresh() -> int:
+    """Rebuild the catalog from LDAP.
+
+    Returns:
+        int: Number of groups in the catalog.
+    """
+    dns = _configured()
+    data = {'dns': dns, 'entries': load(dns), 'refreshed': time.time()}
+    _store(data)
+
+    try:
+        # The catalog is kept without expiry, stale copies are served while refreshing.
+        pipe = django_rq.get_connection('default').pipeline()
+        pipe.set(CATALOG_KEY, pickle.dumps(data))
+        pipe.delete(SCHEDULED_KEY)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f'ldap group catalog not shared, exception: {e}')
+
+    logger.info(f'ldap group catalog refreshed, groups: {len(data["entries"])}')
+    return len(data['entries'])
+
+
+def _schedule_refresh() -> None:
+    from .jobs import refresh_group_catalog
+
+    try:
+        if not django_rq.get_connection('default').set(SCHEDULED_KEY, 1, nx=True, ex=_ttl()):
+            return
+    except RedisError:
+        return
+    refresh_group_catalog.delay()
+
+
+def _shared() -> Optional[dict]:
+    try:
+        data = django_rq.get_connection('default').get(CATALOG_KEY)
+    except RedisError as e:
+        logger.warning(f'ldap group catalog unavailable, exception: {e}')
+        return None
+    return pickle.loads(data) if data else None
+
+
+def _current() -> dict:
+    dns = _configured()
+    data = _catalog
+    if data.get('dns') == dns and time.time() - data['refreshed'] <= _ttl():
+        return data
+
+    data = _shared()
+    if data is None or data['dns'] != dns:
+        refresh()
+        return _catalog
+
+    if time.time() - data['refreshed'] > _ttl():
+        _schedule_refresh()
+    _store(data)
+    return data
+
+
+def groups() -> list[CachedEntry]:
+    """All configured groups, in the order they are configured.
+
+    Returns:
+        list[CachedEntry]: Read-only group entries, with cn, owner and description.
+    """
+    data = _current()
+    return [data['entries'][dn] for dn in data['dns'] if dn in data['entries']]
+
+
+def get(dn: str) -> Optional[CachedEntry]:
+    return _current()['entries'].get(dn)
+
+
+def invalidate() -> None:
+    """Drop the catalog, the next lookup reads it from LDAP."""
+    _store({})
+    if not enabled():
+        return
+
+    try:
+        django_rq.get_connection('default').delete(CATALOG_KEY)
+    except RedisError as e:
+        logger.error(f'ldap group catalog invalidation failed, exception: {e}')
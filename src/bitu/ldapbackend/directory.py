@@ -0,0 +1,413 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Request scoped and shared access to LDAP user entries.
+
+Rendering a single page can require the same LDAP user entry in a number
+of places: the user model, templates, validators and forms. Rather than
+having each of them search LDAP, all reads go through get_user(), which
+keeps an identity map of entries, keyed by uid and DN, for the duration of
+the current request. The map is set up by
+:class:`ldapbackend.middleware.LDAPEntryCacheMiddleware`; outside of a
+request, e.g. in RQ jobs and management commands, every call reads from LDAP.
+
+Optionally user entries and group memberships can also be cached in the
+Redis instance used by RQ, shared by all processes. Entries read from Redis
+are read-only snapshots, code which modifies an entry must request a
+writable entry. The Redis cache is enabled by setting a TTL in BITU_LDAP:
+
+.. code-block:: python
+
+   BITU_LDAP = {
+     ...
+     'cache_ttl': 300,  # Seconds, 0 disables the shared cache.
+   }
+
+Writes must be done using commit(), rather than calling entry_commit_changes()
+directly, to ensure that stale entries are dropped from both caches.
+"""
+import logging
+import pickle
+import threading
+
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional, Union
+
+import bituldap
+import django_rq
+
+from django.conf import settings
+from ldap3 import Entry, SUBTREE
+from ldap3.utils.conv import escape_filter_chars
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger('bitu')
+
+_local = threading.local()
+
+# Attributes which are never written to the shared cache.
+EXCLUDED_ATTRIBUTES = ('userPassword', 'member')
+
+# Maximum number of values in a single OR-filter, for bulk lookups.
+BULK_FILTER_SIZE = 100
+
+
+class CachedAttribute():
+    """Read-only stand-in for an ldap3 attribute, restored from the shared cache."""
+
+    def __init__(self, key: str, values: list) -> None:
+        self.key = key
+        self.values = values
+
+    @property
+    def value(self) -> Any:
+        if len(self.values) == 1:
+            return self.values[0]
+        if not self.values:
+            return None
+        return self.values
+
+    def __str__(self) -> str:
+        if len(self.values) == 1:
+            return str(self.values[0])
+        return str(self.values)
+
+    def __repr__(self) -> str:
+        return f'{self.key}: {self.values}'
+
+    def __eq__(self, other) -> bool:
+        return self.value == other
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, item):
+        return self.values[item]
+
+    def __contains__(self, item) -> bool:
+        return item in self.values
+
+
+class CachedEntry():
+    """Read-only stand-in for an ldap3 entry, restored from the shared cache."""
+
+    def __init__(self, dn: str, attributes: dict[str, list]) -> None:
+        self.entry_dn = dn
+        self.entry_attributes_as_dict = attributes
+        # Attribute names are case insensitive in LDAP and ldap3.
+        self._names = {name.lower(): name for name in attributes}
+
+    @classmethod
+    def from_entry(cls, entry: Entry) -> 'CachedEntry':
+        return cls(entry.entry_dn, {
+            name: list(values)
+            for name, values in entry.entry_attributes_as_dict.items() if name not in EXCLUDED_ATTRIBUTES
+        })
+
+    @property
+    def entry_attributes(self) -> list[str]:
+        return list(self.entry_attributes_as_dict.keys())
+
+    def __getattr__(self, name: str) -> CachedAttribute:
+        names = self.__dict__.get('_names', {})
+        if name.lower() not in names:
+            raise AttributeError(name)
+        key = names[name.lower()]
+        return CachedAttribute(key, self.entry_attributes_as_dict[key])
+
+    def __getitem__(self, name: str) -> CachedAttribute:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __getstate__(self) -> dict:
+        return self.__dict__
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+    def __repr__(self) -> str:
+        return f'DN: {self.entry_dn} (cached)'
+
+
+@contextmanager
+def request_scope() -> Iterator[None]:
+    """Cache user entries read within the scope. Scopes can be nested, the
+    inner scope starts out empty and the outer scope is restored on exit."""
+    previous = getattr(_local, 'entries', None)
+    _local.entries = {}
+    try:
+        yield
+    finally:
+        _local.entries = previous
+
+
+def _entries() -> Optional[dict]:
+    return getattr(_local, 'entries', None)
+
+
+def _uid_key(uid: str) -> tuple[str, str]:
+    # uid uses case insensitive matching in LDAP.
+    return ('uid', str(uid).lower())
+
+
+def _dn_key(dn: str) -> tuple[str, str]:
+    return ('dn', str(dn).lower())
+
+
+def _member_of_key(dn: str) -> tuple[str, str]:
+    return ('member_of', str(dn).lower())
+
+
+def _ttl() -> int:
+    return getattr(settings, 'BITU_LDAP', {}).get('cache_ttl', 0)
+
+
+def _redis_key(key: tuple[str, str]) -> str:
+    return f'ldap:{key[0]}:{key[1]}'
+
+
+def _shared_get(key: tuple[str, str]) -> Any:
+    if not _ttl():
+        return None
+
+    try:
+        data = django_rq.get_connection('default').get(_redis_key(key))
+    except RedisError as e:
+        logger.warning(f'ldap shared cache unavailable, key: {key}, exception: {e}')
+        return None
+    return pickle.loads(data) if data else None
+
+
+def _shared_set(key: tuple[str, str], value: Any) -> None:
+    ttl = _ttl()
+    if not ttl:
+        return
+
+    try:
+        django_rq.get_connection('default').set(_redis_key(key), pickle.dumps(value), ex=ttl)
+    except RedisError as e:
+        logger.warning(f'ldap shared cache unavailable, key: {key}, exception: {e}')
+
+
+def _shared_delete(*keys: tuple[str, str]) -> None:
+    if not _ttl() or not keys:
+        return
+
+    try:
+        django_rq.get_connection('default').delete(*[_redis_key(key) for key in keys])
+    except RedisError as e:
+        # A failed invalidation leaves stale data behind until the TTL expires.
+        logger.error(f'ldap shared cache invalidation failed, keys: {keys}, exception: {e}')
+
+
+def get_user(uid: str, writable: bool = False) -> Union[Entry, CachedEntry, None]:
+    """Get user entry from LDAP, by uid, reusing the entry if it has already
+    been read in the current request or is available in the shared cache.
+
+    Args:
+        uid (str): uid, Unix username.
+        writable (bool, optional): Require a live entry, read from LDAP, which can be
+                                   modified and passed to commit(). Defaults to False.
+
+    Returns:
+        Union[Entry, CachedEntry, None]: LDAP entry or None if the user does not exist.
+    """
+    key = _uid_key(uid)
+    entries = _entries()
+    if entries is not None and key in entries:
+        entry = entries[key]
+        if not writable or not isinstance(entry, CachedEntry):
+            return entry
+
+    entry = None if writable else _shared_get(key)
+    if entry is None:
+        entry = bituldap.get_user(uid)
+        if entry:
+            _shared_set(key, CachedEntry.from_entry(entry))
+
+    if entries is not None:
+        entries[key] = entry
+        if entry:
+            entries[_dn_key(entry.entry_dn)] = entry
+    return entry
+
+
+def member_of(dn: str) -> list[Union[Entry, CachedEntry]]:
+    """Get the groups of which the given DN is a member.
+
+    Args:
+        dn (str): User DN
+
+    Returns:
+        list[Union[Entry, CachedEntry]]: Group entries, read-only.
+    """
+    key = _member_of_key(dn)
+    entries = _entries()
+    if entries is not None and key in entries:
+        return entries[key]
+
+    groups = _shared_get(key)
+    if groups is None:
+        groups = bituldap.member_of(dn)
+        _shared_set(key, [CachedEntry.from_entry(group) for group in groups])
+
+    if entries is not None:
+        entries[key] = groups
+    return groups
+
+
+def invalidate(uid: Optional[str] = None, dn: Optional[str] = None) -> None:
+    """Drop an entry, and group memberships of the entry, from both the
+    identity map of the current request and the shared cache.
+
+    Args:
+        uid (str, optional): uid of the entry to remove.
+        dn (str, optional): DN of the entry to remove.
+    """
+    keys = []
+    if uid:
+        keys.append(_uid_key(uid))
+    if dn:
+        keys.extend([_dn_key(dn), _member_of_key(dn)])
+
+    _shared_delete(*[key for key in keys if key[0] != 'dn'])
+
+    entries = _entries()
+    if not entries:
+        return
+
+    # The entry is stored under both uid and DN, remove all references.
+    stale = [entries[key] for key in keys if key[0] != 'member_of' and entries.get(key) is not None]
+    for key, entry in list(entries.items()):
+        if key in keys or any(entry is s for s in stale):
+            del entries[key]
+
+
+def _changed_members(entry: Entry) -> list[str]:
+    # DNs added to or removed from the member attribute of a group, pending commit.
+    changes = getattr(entry, 'entry_changes', None) or {}
+    return [dn for attribute, operations in changes.items() if attribute.lower() == 'member'
+            for _, values in operations for dn in _values(values)]
+
+
+def commit(entry: Entry) -> bool:
+    """Commit pending changes to an entry and invalidate cached copies. For
+    groups the cached copies of added or removed members are invalidated too.
+
+    Args:
+        entry (Entry): Writable LDAP entry, user or group.
+
+    Returns:
+        bool: True if LDAP accepted the changes.
+    """
+    members = _changed_members(entry)
+    try:
+        return entry.entry_commit_changes()
+    finally:
+        uid = entry.uid.value if 'uid' in entry.entry_attributes else None
+        invalidate(uid=uid, dn=entry.entry_dn)
+        for dn in members:
+            # Users are cached by uid, which is the RDN of user entries.
+            attribute, _, value = dn.split(',')[0].partition('=')
+            invalidate(uid=value if attribute.strip().lower() == 'uid' else None, dn=dn)
+
+
+def _values(value: Any) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def update_attributes(entry: Entry, attributes: dict[str, Any]) -> Optional[list[str]]:
+    """Update attributes of a writable entry, using a single modify operation.
+
+    Values are compared to the current values of the entry, and only attributes
+    which differ are included in the modification. If nothing differs LDAP is
+    not contacted at all.
+
+    Args:
+        entry (Entry): Writable LDAP entry, see get_user().
+        attributes (dict[str, Any]): New values, by attribute name. A list replaces
+                                     all values of a multi-valued attribute.
+
+    Returns:
+        Optional[list[str]]: Names of the changed attributes, None if LDAP rejected
+                             the modification.
+    """
+    current = {name.lower(): values for name, values in entry.entry_attributes_as_dict.items()}
+
+    changed = []
+    for name, value in attributes.items():
+        if _values(current.get(name.lower(), [])) == _values(value):
+            continue
+        setattr(entry, name, value)
+        changed.append(name)
+
+    if changed and not commit(entry):
+        logger.error(f'ldap rejected attribute update, entry: {entry.entry_dn}, attributes: {changed}')
+        return None
+    return changed
+
+
+def _bulk_search(base: str, object_class: str, attribute: str,
+                 values: Iterable[str], attributes: list[str]) -> list[Entry]:
+    values = sorted({str(v) for v in values})
+    if not values:
+        return []
+
+    bound, connection = bituldap.create_connection()
+    if not bound:
+        return []
+
+    entries = []
+    for i in range(0, len(values), BULK_FILTER_SIZE):
+        terms = ''.join(f'({attribute}={escape_filter_chars(v)})'
+                        for v in values[i:i + BULK_FILTER_SIZE])
+        connection.search(base, f'(&(objectClass={object_class})(|{terms}))',
+                          SUBTREE, attributes=attributes)
+        entries.extend(connection.entries)
+    return entries
+
+
+def get_users(uids: Iterable[str], attributes: list[str]) -> list[Entry]:
+    """Get multiple users, by uid, using a single search per BULK_FILTER_SIZE uids.
+
+    Only the requested attributes are read. The entries are not cached, as
+    they are partial, and uids which do not exist are silently skipped.
+
+    Args:
+        uids (Iterable[str]): uids, Unix usernames.
+        attributes (list[str]): Attributes to read.
+
+    Returns:
+        list[Entry]: Read-only LDAP entries.
+    """
+    config = bituldap.read_configuration()
+    return _bulk_search(config.users.dn, config.users.object_classes[0], 'uid', uids, attributes)
+
+
+def get_users_by_dn(dns: Iterable[str], attributes: list[str]) -> list[Entry]:
+    """Get multiple users by DN, see get_users(). DNs must use uid as RDN."""
+    uids = [dn.split(',')[0].split('=', 1)[1] for dn in dns
+            if dn.split(',')[0].split('=', 1)[0].lower() == 'uid']
+    return get_users(uids, attributes)
+
+
+def get_groups(names: Iterable[str], attributes: list[str]) -> list[Entry]:
+    """Get multiple groups, by cn, see get_users().
+
+    Args:
+        names (Iterable[str]): Group names, cn.
+        attributes (list[str]): Attributes to read.
+
+    Returns:
+        list[Entry]: Read-only LDAP entries.
+    """
+    config = bituldap.read_configuration()
+    return _bulk_search(config.groups.dn, config.groups.object_classes[0], 'cn', names, attributes)
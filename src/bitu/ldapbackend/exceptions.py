@@ -1,2 +1,6 @@
 class UIDRangeException(Exception):
     pass
+
+
+class LDAPPoolTimeout(Exception):
+    pass
@@ -1,7 +1,6 @@
 from typing import Union
 
 import logging
-import bituldap
 
 from django import forms
 from django.conf import settings
@@ -11,6 +10,7 @@ from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 from ldap3 import Entry
 
+from . import directory
 from .models import get_ldap_attributes_editable
 from .validators import ldap_password_verification
 
@@ -34,7 +34,7 @@ class LDAPUserForm(forms.Form):
     def __init__(self, uid, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.user: Union[Entry, None] = bituldap.get_user(uid)
+        self.user: Union[Entry, None] = directory.get_user(uid, writable=True)
         self.allow_list = get_ldap_attributes_editable()
         if not self.user:
             raise ObjectDoesNotExist(uid)
@@ -75,13 +75,10 @@ class LDAPUserForm(forms.Form):
         if not self.is_valid() or not self.user:
             return False
 
-        if not self.has_changed:
+        if not self.has_changed():
             return True
 
-        for name, value in self.cleaned_data.items():
-            setattr(self.user, name, value)
-
-        return self.user.entry_commit_changes()
+        return directory.update_attributes(self.user, self.cleaned_data) is not None
 
 
 class PasswordChangeForm(forms.Form):
@@ -1,9 +1,9 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
-from typing import TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING
 
 import bituldap
 
-from . import jobs
+from . import directory, jobs, uid as uid_allocator
 from .exceptions import UIDRangeException
 from bitu.helpers import capitalize_first
 
@@ -20,6 +20,9 @@ if TYPE_CHECKING:
 
 
 def get_new_uid() -> int:
+    if uid_allocator.enabled():
+        return uid_allocator.reserve()[0]
+
     uid: int = bituldap.next_uid_number()
 
     ranges = settings.BITU_SUB_SYSTEMS.get('ldapbackend', {}).get('uid_ranges', [])
@@ -33,7 +36,20 @@ def get_new_uid() -> int:
     raise UIDRangeException(f"uid: {uid}, ranges: {ranges}")
 
 
-def user_data_fill(signup: 'Signup', entry: 'Entry'):
+def user_data_fill(signup: 'Signup', entry: 'Entry', uid_number: Optional[int] = None):
+    """Populate a new LDAP user entry from a signup. Replacements assigned to
+    default_ldap_user_data_fill must accept the optional uid_number keyword,
+    passed by batch user creation with a UID number already reserved.
+
+    Args:
+        signup (Signup): Activated signup
+        entry (Entry): New, writable, LDAP user entry
+        uid_number (int, optional): Reserved UID number. Defaults to None, where
+                                    a new UID number is allocated.
+
+    Returns:
+        Entry: The populated entry.
+    """
     # To ensure compatibility with MediaWiki, ensure that the first
     # character in cn and sn are capitalized, while touching none of
     # of the remaining characthers in the string.
@@ -44,7 +60,7 @@ def user_data_fill(signup: 'Signup', entry: 'Entry'):
     entry.cn = capitalize_first(signup.username)
 
     entry.uid = signup.uid.lower()
-    entry.uidNumber = get_new_uid()
+    entry.uidNumber = uid_number if uid_number is not None else get_new_uid()
     entry.homeDirectory = f'/home/{signup.uid.lower()}'
     entry.gidNumber = settings.LDAP_USER_CONF['default_gid']
     entry.userPassword = signup.signuppassword_set.get(module='ldapbackend').value
@@ -91,9 +107,9 @@ def get_comment_from_imported_ssh_key(key: bytes) -> str:
 
 
 def change_password(user, password):
-    entry = bituldap.get_user(user.get_username())
+    entry = directory.get_user(user.get_username(), writable=True)
     entry.userPassword = lsm.hash(password)
-    return entry.entry_commit_changes()
+    return directory.commit(entry)
 
 
 def check_ssh_key(key: 'SSHKey'):
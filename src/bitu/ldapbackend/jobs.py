@@ -1,16 +1,16 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 import logging
-from typing import Dict, NewType, TYPE_CHECKING
+from typing import Dict, List, NewType, TYPE_CHECKING
 
 import bituldap
 
 from django.conf import settings
 from django.utils.timezone import localtime
 from django_rq import job
-from sshpubkeys import SSHKey as SSHPublicKey
 
 from bitu import utils
-from . import helpers
+from keymanagement.helpers import ssh_key_finger_print
+from . import catalog, directory, helpers, membership, sshkeys, uid as uid_allocator
 from .exceptions import UIDRangeException
 
 
@@ -26,7 +26,7 @@ system = __name__.split('.')[0]
 
 @job
 def create_user(signup: 'Signup'):
-    if bituldap.get_user(signup.uid):
+    if directory.get_user(signup.uid, writable=True):
         return True
 
     user = bituldap.new_user(signup.uid)
@@ -44,7 +44,7 @@ def create_user(signup: 'Signup'):
     except Exception:
         return False
 
-    success = user.entry_commit_changes()
+    success = directory.commit(user)
 
     if success:
         try:
@@ -74,6 +74,93 @@ def create_user(signup: 'Signup'):
     return success
 
 
+@job
+def create_users(signups: List['Signup']):
+    """Create LDAP users for a batch of activated signups, e.g. during imports.
+    Queued by the create_users management command.
+
+    Unlike create_user(), existing users are found with a single search, UID
+    numbers are reserved as one block, if the UID allocator is enabled, each
+    default group is updated with one modify and a single summary is sent to
+    the administrators.
+
+    Args:
+        signups (List[Signup]): Activated signups.
+
+    Returns:
+        List[str]: DNs of the users created.
+    """
+    existing = {
+        str(v).lower()
+        for entry in directory.get_users([s.uid for s in signups], attributes=['uid'])
+        for v in entry.entry_attributes_as_dict.get('uid', [])
+    }
+    pending = [s for s in signups if s.uid.lower() not in existing]
+    skipped = len(signups) - len(pending)
+
+    uid_numbers = [None] * len(pending)
+    if pending and uid_allocator.enabled():
+        try:
+            uid_numbers = uid_allocator.reserve(len(pending))
+        except UIDRangeException as e:
+            utils.send_service_message(
+                'Error creating users',
+                f"""Failed to allocate {len(pending)} UID Numbers, range violation.
+                Exception: {e}
+                """)
+            return []
+
+    created = []
+    failed = []
+    for signup, uid_number in zip(pending, uid_numbers):
+        try:
+            user = helpers.default_ldap_user_data_fill(signup, bituldap.new_user(signup.uid), uid_number=uid_number)
+            success = directory.commit(user)
+        except Exception as e:
+            logger.error(f'Failed to create user {signup.uid}, exception: {e}')
+            success = False
+
+        if success:
+            created.append(user.entry_dn)
+        else:
+            failed.append(signup.uid)
+
+    group_failures = []
+    for group_name in settings.BITU_SUB_SYSTEMS['ldapbackend'].get('default_groups', []) if created else []:
+        try:
+            group = bituldap.get_group(group_name)
+        except Exception as e:
+            logger.error(f'Failed to read group {group_name}, users not added: {", ".join(created)}, exception: {e}')
+            group_failures.append(group_name)
+            continue
+        if not group:
+            continue
+        group.member.add(created)
+        try:
+            success = directory.commit(group)
+        except Exception as e:
+            logger.error(f'Failed to add users to group {group_name}, exception: {e}')
+            success = False
+
+        if success:
+            for user_dn in created:
+                membership.add(user_dn, group.entry_dn)
+        else:
+            group_failures.append(group_name)
+
+    logger.info(f'batch user creation, created: {len(created)}, existing: {skipped}, failed: {len(failed)}')
+    utils.send_service_message(f'LDAP users created: {len(created)}',
+                               f"""Batch user creation completed by Bitu.\n\n
+                               Created: {len(created)}\n
+                               Already existing: {skipped}\n
+                               Failed: {', '.join(failed) if failed else 'none'}\n
+                               Failed default groups: {', '.join(group_failures) if group_failures else 'none'}\n
+                               Completion time: {localtime()}\n
+                               """,
+                               limited=not (failed or group_failures))
+    return created
+
+
 @job
 def add_to_default_groups(user_dn):
     for group_name in settings.BITU_SUB_SYSTEMS['ldapbackend'].get('default_groups', []):
@@ -81,28 +168,37 @@ def add_to_default_groups(user_dn):
         if not group:
             continue
         group.member.add(user_dn)
-        group.entry_commit_changes()
+        if directory.commit(group):
+            membership.add(user_dn, group.entry_dn)
+
+
+@job
+def refresh_membership_index(full: bool = False):
+    return membership.refresh(full=full)
+
+
+@job
+def refresh_group_catalog():
+    return catalog.refresh()
 
 
 @job
 def update_ldap_attributes(user: 'User', attributes: Dict):
-    ldap_user = bituldap.get_user(user.get_username())
+    ldap_user = directory.get_user(user.get_username(), writable=True)
     if not ldap_user:
         logger.warning(
             f'failed to update user attributes, user not found in LDAP, user={user.get_username()},\
 attributes={attributes}')
         return
 
-    for k, v in attributes.items():
-        setattr(ldap_user, k, v)
-        ldap_user.entry_commit_changes()
-
-    logger.info(f'update ldap user: {ldap_user} with attributes: {attributes}')
+    changed = directory.update_attributes(ldap_user, attributes)
+    logger.info(f'update ldap user: {ldap_user.entry_dn} with attributes: {attributes}, changed: {changed}')
+    return changed
 
 
 @job
 def check_ssh_key(key: 'SSHKey'):
-    ldap_user = bituldap.get_user(key.user.get_username())
+    ldap_user = directory.get_user(key.user.get_username(), writable=True)
     if key.key_as_byte_string in ldap_user.sshPublicKey:
         key.active = True
         key.system = system
@@ -117,66 +213,49 @@ def update_ssh_key(key: 'SSHKey'):
     if not key.active:
         return
 
-    ldap_user = bituldap.get_user(key.user.get_username())
+    ldap_user = directory.get_user(key.user.get_username(), writable=True)
     if key.key_as_byte_string not in ldap_user.sshPublicKey:
         ldap_user.sshPublicKey.add(key.key_as_byte_string)
-        ldap_user.entry_commit_changes()
+        directory.commit(ldap_user)
 
 
 @job
 def remove_ssh_key(key: 'SSHKey'):
-    if key.active:
+    # Keys without a finger print would match every unparsable value in LDAP.
+    if key.active or not key.finger_print:
         return
 
-    ldap_user = bituldap.get_user(key.user.get_username())
+    ldap_user = directory.get_user(key.user.get_username(), writable=True)
     for k in ldap_user.sshPublicKey:
-        ssh_public_key = SSHPublicKey(keydata=k.decode('utf8'))
-        if ssh_public_key.hash_sha512() == key.get_finger_print():
+        if ssh_key_finger_print(k.decode('utf8')) == key.finger_print:
             ldap_user.sshPublicKey.delete(k)
-            ldap_user.entry_commit_changes()
+            directory.commit(ldap_user)
 
 
 def push_ssh_key(key: 'SSHKey'):
-    # Key is not relevant for this backend or not active.
-    if key.system != system or not key.active:
+    # Key is not relevant for this backend, not active or not valid.
+    if key.system != system or not key.active or not key.finger_print:
         return
 
     # Check if the key already exists in LDAP and only add if finger print is not found.
-    ldap_user = bituldap.get_user(key.user.get_username())
-    finger_prints = [SSHPublicKey(keydata=k.decode('utf8')).hash_sha512() for k in ldap_user.sshPublicKey]
-    if key.get_finger_print() in finger_prints:
+    ldap_user = directory.get_user(key.user.get_username(), writable=True)
+    finger_prints = {ssh_key_finger_print(k.decode('utf8')) for k in ldap_user.sshPublicKey}
+    if key.finger_print in finger_prints:
         return
 
     ldap_user.sshPublicKey.add(key.key_as_byte_string)
-    ldap_user.entry_commit_changes()
+    directory.commit(ldap_user)
 
 
 @job
 def syncronize_ssh_keys(user: 'User'):
-    ldap_user = bituldap.get_user(user.get_username())
-
-    # Remove all key which have been marked as inactive from LDAP.
-    # Because LDAP is less restrictive than Bitu in regards to whitespace and newlines,
-    # loop through all the keys stored in LDAP and check if it matches an inactive key
-    # in the Bitu database. Note that if the user SHOULD somehow have duplicate keys in
-    # Bitu, either can trigger a removal in LDAP. The key removed from LDAP MUST be the
-    # key as returned from LDAP as the cleaned up version stored in Bitu will not match
-    # and the key will therefor not be removed.
-    for key in ldap_user.sshPublicKey:
-        key_obj = user.ssh_keys.filter(active=False, system=system, ssh_public_key=key.decode('utf8').strip())
-        if key_obj:
-            ldap_user.sshPublicKey.delete(key)
-
-    # Check if we have any keys stored in Bitu which should exist in LDAP. We compare the
-    # keys stored in Bitu with the list from LDAP where the keys have been trimmed, to avoid
-    # adding a key which already exist in LDAP, but with whitespace and a newline at the end.
-    ldap_keys = [ldap_key.strip() for ldap_key in ldap_user.sshPublicKey]
-    for key in user.ssh_keys.filter(system=system, active=True):
-        if key.key_as_byte_string not in ldap_keys:
-            ldap_user.sshPublicKey.add(key.key_as_byte_string)
-
-    ldap_user.entry_commit_changes()
-    load_ssh_key(user)
+    """Push active keys in Bitu to LDAP, remove deactivated keys from LDAP and
+    import keys found only in LDAP.
+
+    Args:
+        user (User): User
+    """
+    return sshkeys.reconcile(user, push=True)
 
 
 @job
@@ -186,76 +265,4 @@ def load_ssh_key(user: 'User'):
     Args:
         user (User): User
     """
-    from keymanagement.models import SSHKey
-
-    ldap_user = bituldap.get_user(user.get_username())
-
-    # Load finger prints for keys in LDAP
-    finger_prints = [SSHPublicKey(keydata=k.decode('utf8')).hash_sha512() for k in ldap_user.sshPublicKey]
-
-    # Check if we have any keys that are listed as active, but not in LDAP.
-    # LDAP is authoritive, so deactivate any keys not found.
-    key: SSHKey
-    for key in user.ssh_keys.filter(system=system):
-        if key.active and key.get_finger_print() not in finger_prints:
-            key.active = False
-            key.save()
-
-        if not key.active:
-            key.system = ''
-            key.save()
-
-    # Map all our (Bitus) SSH keys to an dict, using finger prints
-    # as keys.
-    existing = {}
-    for key in user.ssh_keys.all():
-        existing[key.get_finger_print()] = key
-
-    # Get all keys from LDAP and compare them to those in the database.
-    for k in ldap_user.sshPublicKey.values:
-        key_obj = SSHPublicKey(keydata=k.decode('utf8'))
-
-        # Key already exists in the database and is correctly listed as active.
-        # Skip futher processing.
-        if key_obj.hash_sha512() in existing and existing[key_obj.hash_sha512()].active:
-            continue
-
-        # New key found in LDAP. Import and mark as active.
-        if key_obj.hash_sha512() not in existing:
-            ssh_key = SSHKey(
-                user=user,
-                ssh_public_key=k.decode('utf8'),
-                system=system,
-                comment=key_obj.comment,
-                active=True)
-
-            # Key does not have a comment, note in the database where we got the key
-            # instead, to provide context for the user.
-            if not ssh_key.comment:
-                ssh_key.comment = f'Imported from {ssh_key.get_system_display()}'
-
-            try:
-                # Set _skip_signal to indicate that we do not want to trigger the
-                # signals for syncronization with LDAP. Failure to do so will result
-                # in multiple iteration, potentially endless.
-                ssh_key._skip_signal = True
-                ssh_key.save()
-            except Exception as e:
-                logger.warning(
-                    f'failed to import ssh key from ldap for user: {user.get_username()}, exception was: {e}')
-
-            # Add the new key and finger print to the list of existing keys, to avoid
-            # processing identical keys from LDAP. LDAP doesn't validate the SSH keys
-            # and it is possible to have a key listed multiple times.
-            existing[ssh_key.get_finger_print()] = ssh_key
-
-        # The key from LDAP does exist in Bitu, but is not active.
-        # Update the key to indicate that it is currently used in LDAP
-        elif not existing[key_obj.hash_sha512()].active:
-            ssh_key = existing[key_obj.hash_sha512()]
-            ssh_key.system = system
-            ssh_key.active = True
-
-            # Indicate that we do not want to process signals.
-            ssh_key._skip_signal = True
-            ssh_key.save()
+    return sshkeys.reconcile(user)
@@ -0,0 +1,42 @@
+import logging
+
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+
+from ldapbackend import jobs
+from signups.models import Signup
+
+logger = logging.getLogger('bitu')
+
+
+class Command(BaseCommand):
+    help = "Create LDAP users for activated signups in batches, e.g. after an import"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--uid',
+            '-u',
+            action='append',
+            help='Only create the user for this signup, may be repeated'
+        )
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=500,
+                            help='Number of signups created per job'
+                            )
+
+    def handle(self, *args: Any, **options: Any):
+        # Users already in LDAP are skipped by create_users(), so all activated
+        # signups can safely be passed on.
+        signups = Signup.objects.filter(is_active=True).order_by('created_date')
+        if options.get('uid'):
+            signups = signups.filter(uid__in=options['uid'])
+
+        batch_size = max(options['batch_size'], 1)
+        signups = list(signups)
+        for start in range(0, len(signups), batch_size):
+            jobs.create_users.delay(signups[start:start + batch_size])
+
+        batches = (len(signups) + batch_size - 1) // batch_size
+        logger.info(f'batch user creation queued, signups: {len(signups)}, jobs: {batches}')
+        self.stdout.write(f'Queued {len(signups)} signups in {batches} jobs')
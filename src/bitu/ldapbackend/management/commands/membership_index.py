@@ -0,0 +1,24 @@
+import logging
+
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+
+from ldapbackend import membership
+
+logger = logging.getLogger('bitu')
+
+
+class Command(BaseCommand):
+    help = "Refresh the LDAP group membership index"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--full',
+            '-f',
+            action='store_true',
+            help='Rebuild the index from all groups, removing deleted groups'
+        )
+
+    def handle(self, *args: Any, **options: Any):
+        groups = membership.refresh(full=options.get('full', False))
+        self.stdout.write(f'Updated {groups} groups')
@@ -0,0 +1,30 @@
+import logging
+
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+
+from ldapbackend import uid
+
+logger = logging.getLogger('bitu')
+
+
+class Command(BaseCommand):
+    help = "Show remaining UID numbers per range, optionally reseed the UID allocator from LDAP"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--seed',
+            '-s',
+            action='store_true',
+            help='Reset the UID counter to the next free UID number in LDAP'
+        )
+
+    def handle(self, *args: Any, **options: Any):
+        if options.get('seed', False):
+            next_uid = uid.seed(force=True)
+            logger.info(f'uid allocator reseeded from ldap, next uid: {next_uid}')
+            self.stdout.write(f'Next UID number: {next_uid}')
+
+        for uid_range in uid.capacity():
+            remaining = uid_range['remaining'] if uid_range['remaining'] is not None else 'unlimited'
+            self.stdout.write(f"{uid_range['min']} - {uid_range['max'] or ''}: {remaining}")
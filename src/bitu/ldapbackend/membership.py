@@ -0,0 +1,222 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Index of group memberships, from user DN to group DNs.
+
+bituldap.member_of() does a subtree search of all groups for every call.
+When enabled the membership index is kept in the Redis instance used by RQ,
+as one set of group DNs per user, which can be read with a single command.
+The index is refreshed incrementally, only groups with a modifyTimestamp
+newer than the previous refresh are read from LDAP.
+
+.. code-block:: python
+
+   BITU_LDAP = {
+     ...
+     'membership_index_max_age': 120,  # Seconds, 0 disables the index.
+   }
+
+The index is considered stale if it has not been refreshed within
+membership_index_max_age seconds, in which case lookups fall back to
+searching LDAP and a refresh is queued. Deleted groups are not visible
+to modifyTimestamp polling, they are only removed by a full rebuild:
+
+.. code-block:: bash
+
+   ./manage.py membership_index [--full]
+"""
+import logging
+import time
+
+from datetime import datetime
+
+import bituldap
+import django_rq
+
+from django.conf import settings
+from ldap3 import SUBTREE
+from redis.exceptions import RedisError
+
+from . import directory
+
+
+logger = logging.getLogger('bitu')
+
+REFRESHED_KEY = 'ldap:membership:refreshed'
+WATERMARK_KEY = 'ldap:membership:watermark'
+GROUPS_KEY = 'ldap:membership:groups'
+SCHEDULED_KEY = 'ldap:membership:scheduled'
+
+
+def _max_age() -> int:
+    return getattr(settings, 'BITU_LDAP', {}).get('membership_index_max_age', 0)
+
+
+def _user_key(dn: str) -> str:
+    return f'ldap:membership:user:{dn.lower()}'
+
+
+def _group_key(dn: str) -> str:
+    return f'ldap:membership:group:{dn.lower()}'
+
+
+def _decode(values) -> set[str]:
+    return {v.decode() if isinstance(v, bytes) else v for v in values}
+
+
+def _generalized_time(value) -> str:
+    if isinstance(value, datetime):
+        return value.strftime('%Y%m%d%H%M%SZ')
+    return str(value)
+
+
+def is_fresh() -> bool:
+    max_age = _max_age()
+    if not max_age:
+        return False
+
+    try:
+        refreshed = django_rq.get_connection('default').get(REFRESHED_KEY)
+    except RedisError as e:
+        logger.warning(f'ldap membership index unavailable, exception: {e}')
+        return False
+    return refreshed is not None and time.time() - float(refreshed) <= max_age
+
+
+def _schedule_refresh() -> None:
+    from .jobs import refresh_membership_index
+
+    try:
+        # Only queue a single refresh, regardless of how many lookups found
+        # the index to be stale.
+        redis = django_rq.get_connection('default')
+        if not redis.set(SCHEDULED_KEY, 1, nx=True, ex=_max_age()):
+            return
+    except RedisError:
+        return
+    refresh_membership_index.delay()
+
+
+def group_dns(dn: str) -> set[str]:
+    """Get the DNs of the groups of which the given DN is a member.
+
+    Uses the membership index if it is up to date, otherwise LDAP is searched.
+
+    Args:
+        dn (str): User DN
+
+    Returns:
+        set[str]: Group DNs
+    """
+    if is_fresh():
+        try:
+            return _decode(django_rq.get_connection('default').smembers(_user_key(dn)))
+        except RedisError as e:
+            logger.warning(f'ldap membership index unavailable, exception: {e}')
+    elif _max_age():
+        _schedule_refresh()
+
+    return {group.entry_dn for group in directory.member_of(dn)}
+
+
+def is_member(dn: str, group_dn: str) -> bool:
+    return group_dn in group_dns(dn)
+
+
+def add(dn: str, group_dn: str) -> None:
+    """Record a membership added by Bitu, so that it is visible before the next refresh.
+
+    Args:
+        dn (str): User DN
+        group_dn (str): Group DN
+    """
+    if not _max_age():
+        return
+
+    try:
+        pipe = django_rq.get_connection('default').pipeline()
+        pipe.sadd(_user_key(dn), group_dn)
+        pipe.sadd(_group_key(group_dn), dn)
+        pipe.sadd(GROUPS_KEY, group_dn)
+        pipe.execute()
+    except RedisError as e:
+        logger.error(f'failed to update ldap membership index, user: {dn}, group: {group_dn}, exception: {e}')
+
+
+def _update_group(redis, group_dn: str, members: set[str]) -> None:
+    previous = _decode(redis.smembers(_group_key(group_dn)))
+
+    pipe = redis.pipeline()
+    for member in previous - members:
+        pipe.srem(_user_key(member), group_dn)
+    for member in members - previous:
+        pipe.sadd(_user_key(member), group_dn)
+    pipe.delete(_group_key(group_dn))
+    if members:
+        pipe.sadd(_group_key(group_dn), *members)
+    pipe.sadd(GROUPS_KEY, group_dn)
+    pipe.execute()
+
+
+def _remove_group(redis, group_dn: str) -> None:
+    _update_group(redis, group_dn, set())
+    redis.srem(GROUPS_KEY, group_dn)
+
+
+def refresh(full: bool = False) -> int:
+    """Update the membership index from LDAP.
+
+    Args:
+        full (bool, optional): Read all groups, rather than only those modified
+                               since the last refresh, and remove deleted groups
+                               from the index. Defaults to False.
+
+    Returns:
+        int: Number of groups read from LDAP.
+    """
+    redis = django_rq.get_connection('default')
+    config = bituldap.read_configuration()
+
+    bound, connection = bituldap.create_connection()
+    if not bound:
+        logger.error('ldap membership index refresh failed, unable to bind')
+        return 0
+
+    watermark = None if full else redis.get(WATERMARK_KEY)
+    search_filter = f'(objectClass={config.groups.object_classes[0]})'
+    if watermark:
+        # The watermark is inclusive, groups modified in the same second as the
+        # previous refresh are read again, updating the index is idempotent.
+        search_filter = f'(&{search_filter}(modifyTimestamp>={watermark.decode()}))'
+
+    started = time.time()
+    latest = watermark.decode() if watermark else ''
+    seen = set()
+    results = connection.extend.standard.paged_search(
+        config.groups.dn, search_filter, SUBTREE,
+        attributes=['member', 'modifyTimestamp'],
+        paged_size=500, generator=True)
+
+    for result in results:
+        if result.get('type') != 'searchResEntry':
+            continue
+
+        attributes = result['attributes']
+        _update_group(redis, result['dn'], set(attributes.get('member', [])))
+        seen.add(result['dn'].lower())
+
+        timestamp = _generalized_time(attributes.get('modifyTimestamp', ''))
+        latest = max(latest, timestamp)
+
+    if full:
+        for group_dn in _decode(redis.smembers(GROUPS_KEY)):
+            if group_dn.lower() not in seen:
+                _remove_group(redis, group_dn)
+
+    pipe = redis.pipeline()
+    if latest:
+        pipe.set(WATERMARK_KEY, latest)
+    pipe.set(REFRESHED_KEY, started)
+    pipe.delete(SCHEDULED_KEY)
+    pipe.execute()
+
+    logger.info(f'ldap membership index refreshed, full: {full}, groups: {len(seen)}')
+    return len(seen)
@@ -0,0 +1,15 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+from . import directory
+
+
+class LDAPEntryCacheMiddleware:
+    """Keep a per request identity map of LDAP user entries, so that each
+    user is read from LDAP at most once per request.
+    See :mod:`ldapbackend.directory`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with directory.request_scope():
+            return self.get_response(request)
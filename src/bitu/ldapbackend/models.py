@@ -1,11 +1,11 @@
 from typing import Dict, List
 
 
-import bituldap
-
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from . import directory
+
 User = get_user_model()
 
 
@@ -57,7 +57,7 @@ def get_ldap_attributes_view() -> List[Dict]:
 
 
 def load_attribute_values(user: 'User', attributes: List[Dict]):
-    user = bituldap.get_user(user.username)
+    user = directory.get_user(user.username)
     for attribute in attributes:
         attribute['value'] = getattr(user, attribute['name'], '')
     return attributes
@@ -4,11 +4,13 @@ from typing import Union
 
 import bituldap
 
-from django.conf import settings
 from ldap3 import ObjectDef, Entry, Reader, Writer
 
 from permissions.models import Permission, PermissionRequest
 from permissions.permission import BaseBackend, User
+from permissions.rules import access_rules
+
+from . import catalog, directory, membership
 
 
 logger = logging.getLogger('bitu')
@@ -19,7 +21,10 @@ class LDAPPermissions(BaseBackend):
 
     @property
     def groups(self):
-        keys = settings.ACCESS_REQUEST_RULES.get(self.name, {}).keys()
+        if catalog.enabled():
+            return catalog.groups()
+
+        keys = access_rules().keys(self.name)
         groups = []
         for key in keys:
             groups.extend(self._get_groups_by_dn(key, attributes=['cn', 'owner', 'description']))
@@ -51,19 +56,12 @@ class LDAPPermissions(BaseBackend):
                 return group
         return None
 
-    def get_state(self, user, entry: Entry):
-        pr = PermissionRequest.objects.filter(
-            user=user,
-            system=self.name,
-            key=entry.entry_dn.__str__()).order_by('-created').first()
-        if pr is None:
-            return PermissionRequest.SYNCRONIZED
-        return pr.status
-
     def _entries_to_permission_list(self, user: User, entries: list[Entry]) -> list[Permission]:
         perms: list[Permission] = []
+        requests = PermissionRequest.latest_for(user, [(self.name, entry.entry_dn.__str__()) for entry in entries])
         for entry in entries:
-            perms.append(Permission(
+            request = requests.get((self.name, entry.entry_dn.__str__()))
+            permission = Permission(
                 key=entry.entry_dn,
                 name=entry.cn.__str__(),
                 description=entry.description if entry.description else '',
@@ -71,48 +69,53 @@ class LDAPPermissions(BaseBackend):
                 source_display='LDAP',
                 owners=entry.owner,
                 user=user,
-                state=self.get_state(user, entry)
-            ))
+                state=request.status if request else PermissionRequest.SYNCRONIZED
+            )
+            permission.request = request
+            perms.append(permission)
         return perms
 
     def get_permission(self, key) -> Union[Permission, None]:
-        permissions = self._get_groups_by_dn(key)
+        if catalog.enabled():
+            entry = catalog.get(key)
+            permissions = [entry] if entry else []
+        else:
+            permissions = [entry for entry in self._get_groups_by_dn(key) if key == entry.entry_dn]
         for entry in permissions:
-            if key == entry.entry_dn:
-                return Permission(
-                    key=entry.entry_dn,
-                    name=entry.cn.__str__(),
-                    description=entry.description if entry.description else '',
-                    source=self.name,
-                    source_display='LDAP',
-                    owners=entry.owner,
-                    state=PermissionRequest.SYNCRONIZED
-                )
+            return Permission(
+                key=entry.entry_dn,
+                name=entry.cn.__str__(),
+                description=entry.description if entry.description else '',
+                source=self.name,
+                source_display='LDAP',
+                owners=entry.owner,
+                state=PermissionRequest.SYNCRONIZED
+            )
         return None
 
-    def available_permissions(self, user: User) -> list[Permission]:
-        existing = [p.key for p in self.existing_permissions(user)]
-        available = []
+    def permissions(self, user: User) -> tuple[list[Permission], list[Permission]]:
+        # Read the groups and memberships once, for both lists.
+        ldap_user = directory.get_user(user.get_username())
+        group_dns = membership.group_dns(ldap_user.entry_dn)
+        permissions = self._entries_to_permission_list(user, list(self.groups))
 
-        for group in self.groups:
-            if group.entry_dn not in existing:
-                available.append(group)
+        existing = [p for p in permissions if p.key in group_dns]
+        available = [p for p in permissions if p.key not in group_dns]
+        return existing, available
 
-        return self._entries_to_permission_list(user, available)
+    def available_permissions(self, user: User) -> list[Permission]:
+        return self.permissions(user)[1]
 
     def existing_permissions(self, user: User) -> list[Permission]:
-        ldap_user = bituldap.get_user(user.get_username())
-        return self._entries_to_permission_list(user, bituldap.member_of(ldap_user.entry_dn))
+        return self.permissions(user)[0]
 
     def grant(self, user: User, permission: Permission):
         if permission.source != self.name:
             # Permission does not belong to this backend.
             return
 
-        ldap_user = bituldap.get_user(user.get_username())
-        groups = bituldap.member_of(ldap_user.entry_dn)
-
-        if permission.key in [g.entry_dn for g in groups]:
+        ldap_user = directory.get_user(user.get_username())
+        if membership.is_member(ldap_user.entry_dn, permission.key):
             # Already have permission.
             return
 
@@ -121,5 +124,6 @@ class LDAPPermissions(BaseBackend):
             logger.warning(f'Attempting to add user to non-existing group, system={self.name}, user:{user.get_username()}, group: {permission.key}')
             return
         group.member.add(ldap_user.entry_dn)
-        group.entry_commit_changes()
+        if directory.commit(group):
+            membership.add(ldap_user.entry_dn, group.entry_dn)
         logger.info(f'Add user to group, system={self.name}, user:{user.get_username()}, group: {permission.key}')
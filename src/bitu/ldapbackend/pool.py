@@ -0,0 +1,226 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Process wide pool of bound LDAP connections.
+
+Bitu-LDAP opens and binds a new connection on every call to
+bituldap.create_connection(), which means that a single page view
+can end up doing several TCP connects and binds. When a pool size
+is configured in BITU_LDAP the pool replaces bituldap.create_connection(),
+so all code using Bitu-LDAP, directly or indirectly, reuses connections.
+
+.. code-block:: python
+
+   BITU_LDAP = {
+     ...
+     'pool_size': 10,      # Maximum number of connections per process.
+     'pool_wait': 5,       # Seconds to wait for a free connection.
+     'pool_recycle': 300,  # Probe connections idle for longer than this.
+   }
+
+Connections are leased to the calling thread, as ldap3 connections using
+the default SYNC strategy are not thread safe, and returned to the pool
+when the request finishes.
+"""
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+import bituldap
+
+from django.conf import settings
+from django.core.signals import request_finished
+from ldap3 import Connection
+from ldap3.core.exceptions import LDAPException
+
+from .exceptions import LDAPPoolTimeout
+
+
+logger = logging.getLogger('bitu')
+
+
+class LDAPConnectionPool():
+    def __init__(self, factory: Callable[[], Tuple[bool, Connection]],
+                 size: int = 10, wait: float = 5, recycle: float = 300) -> None:
+        """Create a new connection pool.
+
+        Args:
+            factory (Callable): Function returning a tuple of bind status and a new connection,
+                                same interface as bituldap.create_connection().
+            size (int, optional): Maximum number of connections in use at any given time. Defaults to 10.
+            wait (float, optional): Seconds to wait for a connection to become available. Defaults to 5.
+            recycle (float, optional): Idle connections older than this, in seconds, are probed
+                                       before being handed out. Defaults to 300.
+        """
+        self.factory = factory
+        self.size = size
+        self.wait = wait
+        self.recycle = recycle
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all connections without unbinding them.
+
+        Used after forking, where the sockets are shared with the parent
+        process and must not be used, or closed, by the child.
+        """
+        self._idle: list[Tuple[Connection, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._local = threading.local()
+
+    def _healthy(self, connection: Connection, idle_since: float) -> bool:
+        if connection.closed or not connection.bound:
+            return False
+
+        if time.monotonic() - idle_since < self.recycle:
+            return True
+
+        # The connection has been idle for long enough that the server, or a
+        # firewall, may have dropped it. Do a cheap round trip to verify.
+        try:
+            connection.extend.standard.who_am_i()
+        except LDAPException:
+            return False
+        return connection.result.get('result') == 0
+
+    def _rebind(self, connection: Connection) -> bool:
+        try:
+            if not connection.closed:
+                connection.unbind()
+            # Binding a closed connection will reopen the socket first.
+            return connection.bind()
+        except LDAPException as e:
+            logger.warning(f'ldap connection pool, failed to rebind connection, exception: {e}')
+            return False
+
+    def _discard(self, connection: Connection) -> None:
+        try:
+            connection.unbind()
+        except LDAPException:
+            pass
+
+    def _checkout(self) -> Connection:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, idle_since = self._idle.pop()
+
+            if self._healthy(connection, idle_since) or self._rebind(connection):
+                return connection
+            self._discard(connection)
+
+        _, connection = self.factory()
+        return connection
+
+    def acquire(self) -> Connection:
+        """Get a connection from the pool, opening a new one if no idle connections
+        are available.
+
+        Raises:
+            LDAPPoolTimeout: No connection became available within the configured wait time.
+
+        Returns:
+            Connection: ldap3 connection, which must be returned using release().
+        """
+        if not self._slots.acquire(timeout=self.wait):
+            raise LDAPPoolTimeout(f'no ldap connection available after {self.wait} seconds, pool size: {self.size}')
+
+        try:
+            return self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection: Connection) -> None:
+        """Return a connection to the pool.
+
+        Args:
+            connection (Connection): Connection previously returned by acquire().
+        """
+        with self._lock:
+            keep = not connection.closed and connection.bound and len(self._idle) < self.size
+            if keep:
+                self._idle.append((connection, time.monotonic()))
+
+        if not keep:
+            self._discard(connection)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def create_connection(self) -> Tuple[bool, Connection]:
+        """Drop-in replacement for bituldap.create_connection().
+
+        The connection is leased to the current thread, repeated calls from the
+        same thread return the same connection until release_thread() is called.
+
+        Returns:
+            Tuple[bool, Connection]: Bind status and connection.
+        """
+        connection: Optional[Connection] = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self.acquire()
+            self._local.connection = connection
+        elif connection.closed or not connection.bound:
+            self._rebind(connection)
+        return connection.bound, connection
+
+    def release_thread(self) -> None:
+        """Return the connection leased by the current thread, if any, to the pool."""
+        connection: Optional[Connection] = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+
+        self._local.connection = None
+        self.release(connection)
+
+
+_pool: Optional[LDAPConnectionPool] = None
+
+
+def get_pool() -> Optional[LDAPConnectionPool]:
+    return _pool
+
+
+def release_connection(*args, **kwargs) -> None:
+    """Return the connection held by the current thread, if pooling is enabled.
+    Accepts any arguments so that it can be used as a signal receiver."""
+    if _pool is not None:
+        _pool.release_thread()
+
+
+def install() -> Optional[LDAPConnectionPool]:
+    """Enable connection pooling, if configured, by replacing bituldap.create_connection().
+
+    Returns:
+        Optional[LDAPConnectionPool]: The process wide pool, None if pooling is disabled.
+    """
+    global _pool
+
+    config = getattr(settings, 'BITU_LDAP', {})
+    if _pool is not None or not config.get('pool_size', 0):
+        return _pool
+
+    _pool = LDAPConnectionPool(bituldap.create_connection,
+                               size=config['pool_size'],
+                               wait=config.get('pool_wait', 5),
+                               recycle=config.get('pool_recycle', 300))
+    bituldap.create_connection = _pool.create_connection
+
+    # Web requests return their connection once the response has been sent. RQ
+    # work horses are forked, and must not share sockets with the parent worker.
+    request_finished.connect(release_connection, dispatch_uid='ldapbackend.pool.release_connection')
+    os.register_at_fork(after_in_child=_pool.reset)
+
+    logger.info(f'ldap connection pool enabled, size: {_pool.size}, wait: {_pool.wait}')
+    return _pool
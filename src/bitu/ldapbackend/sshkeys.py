@@ -0,0 +1,191 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Reconciliation of SSH keys between Bitu and LDAP.
+
+Both sides are loaded once and compared by finger print. Changes to LDAP
+are sent as a single modify operation, changes to the Bitu database are
+written in bulk, in one transaction. Bulk writes do not trigger the SSHKey
+signals, so reconciling does not cause further synchronization, the SSH key
+generation is updated explicitly instead.
+"""
+import logging
+
+from dataclasses import dataclass, field
+from typing import NewType, TYPE_CHECKING
+
+from django.db import transaction
+
+from keymanagement.helpers import bump_ssh_keys_generation, ssh_key_finger_print
+
+from . import directory, helpers
+
+
+if TYPE_CHECKING:
+    from django.contrib.auth import get_user_model
+    User = NewType('User', get_user_model())
+
+logger = logging.getLogger('bitu')
+system = __name__.split('.')[0]
+
+
+@dataclass
+class SSHKeyDiff:
+    """Finger prints of the keys changed by a reconciliation."""
+    # LDAP side
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    # Bitu side
+    imported: list[str] = field(default_factory=list)
+    reactivated: list[str] = field(default_factory=list)
+    deactivated: list[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return any((self.added, self.removed, self.imported, self.reactivated, self.deactivated))
+
+    def __str__(self) -> str:
+        return (f'ldap added: {len(self.added)}, ldap removed: {len(self.removed)}, '
+                f'imported: {len(self.imported)}, reactivated: {len(self.reactivated)}, '
+                f'deactivated: {len(self.deactivated)}')
+
+
+def _ldap_keys(ldap_user) -> dict[str, list[bytes]]:
+    # LDAP does not validate keys, the same key may be listed multiple times,
+    # e.g. with trailing whitespace, so map each finger print to all values.
+    keys: dict[str, list[bytes]] = {}
+    for value in ldap_user.sshPublicKey.values:
+        finger_print = ssh_key_finger_print(value.decode('utf8'))
+        if finger_print:
+            keys.setdefault(finger_print, []).append(value)
+    return keys
+
+
+def compare(keys: list, values: list[bytes]) -> SSHKeyDiff:
+    """Compute the changes an LDAP authoritive reconcile() would make to the
+    Bitu database, without reading or writing anything.
+
+    Args:
+        keys (list[SSHKey]): All SSH keys of a user in Bitu.
+        values (list[bytes]): sshPublicKey values of the user in LDAP.
+
+    Returns:
+        SSHKeyDiff: Imported, reactivated and deactivated finger prints.
+    """
+    # Values without a finger print can not be parsed and are never compared.
+    ldap_keys = {ssh_key_finger_print(v.decode('utf8')) for v in values} - {''}
+    known = {k.finger_print for k in keys} - {''}
+    active = {k.finger_print for k in keys if k.active and k.system == system} - {''}
+
+    return SSHKeyDiff(
+        imported=sorted(ldap_keys - known),
+        reactivated=sorted((ldap_keys & known) - active),
+        deactivated=sorted(active - ldap_keys),
+    )
+
+
+def _push(ldap_user, keys: list, ldap_keys: dict[str, list[bytes]], diff: SSHKeyDiff) -> None:
+    keys = [k for k in keys if k.finger_print]
+    remove = [k for k in keys if not k.active and k.system == system and k.finger_print in ldap_keys]
+    add = {k.finger_print: k for k in keys if k.active and k.system == system and k.finger_print not in ldap_keys}
+
+    if not remove and not add:
+        return
+
+    # The values removed must be those returned by LDAP, as the cleaned up
+    # versions stored in Bitu may differ in whitespace.
+    if remove:
+        values = [value for key in remove for value in ldap_keys.pop(key.finger_print)]
+        ldap_user.sshPublicKey.delete(values)
+        diff.removed.extend(key.finger_print for key in remove)
+    if add:
+        ldap_user.sshPublicKey.add([key.key_as_byte_string for key in add.values()])
+        for finger_print, key in add.items():
+            ldap_keys[finger_print] = [key.key_as_byte_string]
+        diff.added.extend(add.keys())
+
+    if not directory.commit(ldap_user):
+        logger.error(f'failed to update ssh keys in ldap, user: {ldap_user.entry_dn}, {diff}')
+
+
+def _load(user: 'User', keys: list, ldap_keys: dict[str, list[bytes]], diff: SSHKeyDiff) -> None:
+    from keymanagement.models import SSHKey
+
+    updated = []
+    existing = {}
+    for key in keys:
+        # LDAP is authoritive, deactivate any keys not found and detach
+        # inactive keys from this system.
+        if key.system == system and not (key.active and key.finger_print in ldap_keys):
+            if key.active:
+                diff.deactivated.append(key.finger_print)
+            key.active = False
+            key.system = ''
+            updated.append(key)
+        if key.finger_print:
+            existing.setdefault(key.finger_print, key)
+
+    new_keys = []
+    for finger_print, values in ldap_keys.items():
+        key = existing.get(finger_print)
+        if key is None:
+            key = SSHKey(user=user, ssh_public_key=values[0].decode('utf8'), system=system, active=True,
+                         comment=helpers.get_comment_from_imported_ssh_key(values[0]))
+            # Key does not have a comment, note in the database where we got the key
+            # instead, to provide context for the user.
+            if not key.comment:
+                key.comment = f'Imported from {key.get_system_display()}'
+            # bulk_create() does not call save(), populate derived fields.
+            key.clean()
+            new_keys.append(key)
+        elif not key.active:
+            key.system = system
+            key.active = True
+            diff.reactivated.append(finger_print)
+            if key not in updated:
+                updated.append(key)
+
+    # Keys may be registered to another user, those cannot be imported.
+    taken = set(SSHKey.objects.filter(key_digest__in=[k.key_digest for k in new_keys])
+                .values_list('key_digest', flat=True)) if new_keys else set()
+    for key in new_keys:
+        if key.key_digest in taken:
+            logger.warning(f'failed to import ssh key from ldap for user: {user.get_username()}, \
+key already exists: {key.finger_print}')
+    new_keys = [k for k in new_keys if k.key_digest not in taken]
+
+    with transaction.atomic():
+        if updated:
+            SSHKey.objects.bulk_update(updated, ['active', 'system'])
+        if new_keys:
+            SSHKey.objects.bulk_create(new_keys)
+    if updated or new_keys:
+        bump_ssh_keys_generation()
+    diff.imported.extend(k.finger_print for k in new_keys)
+
+
+def reconcile(user: 'User', push: bool = False) -> SSHKeyDiff:
+    """Reconcile the SSH keys of a user between Bitu and LDAP.
+
+    Args:
+        user (User): User
+        push (bool, optional): Add active Bitu keys missing from LDAP and remove keys
+                               deactivated in Bitu from LDAP, before importing.
+                               Defaults to False, where LDAP is authoritive.
+
+    Returns:
+        SSHKeyDiff: Finger prints of the changed keys.
+    """
+    diff = SSHKeyDiff()
+    ldap_user = directory.get_user(user.get_username(), writable=True)
+    if not ldap_user:
+        return diff
+
+    keys = list(user.ssh_keys.all())
+    ldap_keys = _ldap_keys(ldap_user)
+
+    if push:
+        _push(ldap_user, keys, ldap_keys, diff)
+    _load(user, keys, ldap_keys, diff)
+
+    if diff.changed:
+        logger.info(f'ssh keys reconciled, user: {user.get_username()}, {diff}')
+    return diff
@@ -38,6 +38,12 @@ def ldap_value(attribute: dict[str, str]) -> str:
     return attribute['value']
 
 
+@register.filter
+def rdn_value(dn: str) -> str:
+    """Value of the first RDN of a DN, e.g. the cn of a group."""
+    return str(dn).split(',')[0].split('=', 1)[-1]
+
+
 @register.filter
 def action(attribute: dict[str, str]) -> SafeString:
     """Generate 'action' link for an LDAP attribute.
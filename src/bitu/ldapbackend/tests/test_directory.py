@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+import bituldap
+import django_rq
+
+from django.test import TestCase
+
+from ldapbackend import directory, membership
+
+from . import dummy_ldap
+
+
+class LDAPDirectoryTest(TestCase):
+    def setUp(self) -> None:
+        django_rq.get_connection('default').flushdb()
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_identity_map(self, mock_connect):
+        with patch('bituldap.get_user', wraps=directory.bituldap.get_user) as get_user:
+            with directory.request_scope():
+                entry = directory.get_user('scott72')
+                self.assertIs(directory.get_user('scott72'), entry)
+                self.assertIs(directory.get_user('Scott72'), entry)
+                self.assertEqual(get_user.call_count, 1)
+
+            # Outside of a request every call reads from LDAP.
+            directory.get_user('scott72')
+            directory.get_user('scott72')
+            self.assertEqual(get_user.call_count, 3)
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_commit_invalidates(self, mock_connect):
+        with directory.request_scope():
+            entry = directory.get_user('scott72')
+            entry.sn = 'Scott'
+            self.assertTrue(directory.commit(entry))
+
+            fresh = directory.get_user('scott72')
+            self.assertIsNot(fresh, entry)
+            self.assertEqual(fresh.sn.value, 'Scott')
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_shared_cache(self, mock_connect):
+        with self.settings(BITU_LDAP={'cache_ttl': 60}):
+            entry = directory.get_user('scott72')
+            with patch('bituldap.get_user') as get_user:
+                cached = directory.get_user('scott72')
+                get_user.assert_not_called()
+
+            self.assertIsInstance(cached, directory.CachedEntry)
+            self.assertEqual(cached.entry_dn, entry.entry_dn)
+            self.assertEqual(str(cached.uid), 'scott72')
+            self.assertNotIn('userPassword', cached.entry_attributes)
+
+            # Writable entries are always read from LDAP, and committing
+            # changes drops the cached copy.
+            writable = directory.get_user('scott72', writable=True)
+            self.assertNotIsInstance(writable, directory.CachedEntry)
+            writable.sn = 'Scott'
+            directory.commit(writable)
+            self.assertEqual(directory.get_user('scott72').sn.value, 'Scott')
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_group_commit_invalidates_members(self, mock_connect):
+        dn = 'uid=scott72,ou=people,dc=example,dc=org'
+        db = 'cn=db,ou=groups,dc=example,dc=org'
+        with self.settings(BITU_LDAP={'cache_ttl': 60}):
+            self.assertNotIn(db, [g.entry_dn for g in directory.member_of(dn)])
+
+            group = bituldap.get_group('db')
+            group.member.add(dn)
+            self.assertTrue(directory.commit(group))
+            self.assertIn(db, [g.entry_dn for g in directory.member_of(dn)])
+
+            group = bituldap.get_group('db')
+            group.member.delete(dn)
+            self.assertTrue(directory.commit(group))
+            self.assertNotIn(db, [g.entry_dn for g in directory.member_of(dn)])
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_bulk_lookup(self, mock_connect):
+        entries = directory.get_users(['scott72', 'acarr', 'no-such-user'], attributes=['mail'])
+        self.assertEqual(len(entries), 2)
+
+        expected = {directory.get_user(uid).mail.value for uid in ('scott72', 'acarr')}
+        self.assertEqual({e.entry_attributes_as_dict['mail'][0] for e in entries}, expected)
+
+        dns = [e.entry_dn for e in entries]
+        self.assertEqual({e.entry_dn for e in directory.get_users_by_dn(dns, attributes=['mail'])}, set(dns))
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_update_attributes(self, mock_connect):
+        entry = directory.get_user('scott72', writable=True)
+        sn = entry.sn.value
+
+        with patch.object(directory, 'commit', wraps=directory.commit) as commit:
+            changed = directory.update_attributes(entry, {'sn': sn, 'loginShell': '/usr/bin/tmux'})
+            self.assertEqual(changed, ['loginShell'])
+            self.assertEqual(commit.call_count, 1)
+
+            entry = directory.get_user('scott72', writable=True)
+            self.assertEqual(directory.update_attributes(entry, {'loginShell': '/usr/bin/tmux'}), [])
+            self.assertEqual(commit.call_count, 1)
+
+        self.assertEqual(directory.get_user('scott72').loginShell.value, '/usr/bin/tmux')
+
+
+class MembershipIndexTest(TestCase):
+    def setUp(self) -> None:
+        django_rq.get_connection('default').flushdb()
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_index_matches_ldap(self, mock_connect):
+        with self.settings(BITU_LDAP={'membership_index_max_age': 60}):
+            self.assertFalse(membership.is_fresh())
+            membership.refresh(full=True)
+            self.assertTrue(membership.is_fresh())
+
+            dn = directory.get_user('scott72').entry_dn
+            expected = {group.entry_dn for group in directory.bituldap.member_of(dn)}
+            with patch('bituldap.member_of') as member_of:
+                self.assertEqual(membership.group_dns(dn), expected)
+                member_of.assert_not_called()
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_stale_index_falls_back(self, mock_connect):
+        dn = directory.get_user('scott72').entry_dn
+        with patch('bituldap.member_of', return_value=[]) as member_of:
+            self.assertEqual(membership.group_dns(dn), set())
+            member_of.assert_called_once()
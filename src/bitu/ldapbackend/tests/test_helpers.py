@@ -1,6 +1,8 @@
 import bituldap
 
-from ldapbackend import exceptions, helpers, jobs
+import django_rq
+
+from ldapbackend import exceptions, helpers, jobs, uid
 from signups.models import Signup
 
 from django.conf import settings
@@ -71,3 +73,16 @@ class LDAPHelpersTest(TestCase):
             mock_next_uid_number.return_value = 1000000
             self.assertEqual(helpers.get_new_uid(), 1000000)
             self.assertTrue(jobs.create_user(signup2))
+
+    @patch('bituldap.next_uid_number', return_value=49998)
+    def test_uid_allocator(self, mock_next_uid_number: MagicMock):
+        django_rq.get_connection('default').flushdb()
+        ldap_settings = {'uid_allocator': True, 'uid_ranges': LDAP_UID_SETTINGS}
+        with self.settings(BITU_SUB_SYSTEMS={'ldapbackend': ldap_settings}):
+            self.assertEqual(uid.reserve(3), [49998, 49999, 1000000])
+            self.assertEqual(helpers.get_new_uid(), 1000001)
+            mock_next_uid_number.assert_called_once()
+
+            self.assertEqual([r['remaining'] for r in uid.capacity()], [0, 999998])
+            self.assertRaises(exceptions.UIDRangeException, uid.reserve, 1000000)
+            self.assertEqual(uid.reserve(), [1000002])
@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+from datetime import timedelta
+from unittest.mock import patch
+
+import django_rq
+
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from ldapbackend import catalog
+from ldapbackend.permission import LDAPPermissions
+from permissions.models import PermissionRequest
+
+from . import dummy_ldap
+
+
+class LDAPPermissionsTest(TestCase):
+    rules = {
+        'ldapbackend': {
+            f'cn={cn},ou=groups,dc=example,dc=org': [{
+                'module': 'permissions.validators.manager_approval',
+                'managers': ['wwaller'],
+                'count': 1
+            }] for cn in ('NDA', 'ITS', 'db', 'staff')
+        }
+    }
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_bulk_states(self, mock_connect):
+        user, _ = User.objects.get_or_create(username='rachel32')
+        nda = 'cn=NDA,ou=groups,dc=example,dc=org'
+        db = 'cn=db,ou=groups,dc=example,dc=org'
+
+        with self.settings(ACCESS_REQUEST_RULES=self.rules):
+            old = PermissionRequest.objects.create(user=user, system='ldapbackend', key=nda, comment='Old')
+            PermissionRequest.objects.filter(pk=old.pk).update(
+                status=PermissionRequest.REJECTED, created=timezone.now() - timedelta(days=1))
+            PermissionRequest.objects.create(user=user, system='ldapbackend', key=nda, comment='New')
+            rejected = PermissionRequest.objects.create(user=user, system='ldapbackend', key=db, comment='Rejected')
+            PermissionRequest.objects.filter(pk=rejected.pk).update(status=PermissionRequest.REJECTED)
+
+            backend = LDAPPermissions()
+            groups = list(backend.groups)
+            self.assertEqual(len(groups), 4)
+
+            # One query, regardless of the number of groups.
+            with self.assertNumQueries(1):
+                permissions = backend._entries_to_permission_list(user, groups)
+
+            states = {p.key: p.state for p in permissions}
+            self.assertEqual(states[nda], PermissionRequest.PENDING)
+            self.assertEqual(states[db], PermissionRequest.REJECTED)
+            self.assertEqual(states['cn=staff,ou=groups,dc=example,dc=org'], PermissionRequest.SYNCRONIZED)
+            requests = {p.key: p.request for p in permissions}
+            self.assertEqual(requests[nda], PermissionRequest.objects.get(key=nda, comment='New'))
+            self.assertIsNone(requests['cn=staff,ou=groups,dc=example,dc=org'])
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_group_catalog(self, mock_connect):
+        django_rq.get_connection('default').delete(catalog.CATALOG_KEY)
+        catalog.invalidate()
+
+        with self.settings(ACCESS_REQUEST_RULES=self.rules, BITU_LDAP={'group_catalog_ttl': 300}):
+            backend = LDAPPermissions()
+            groups = backend.groups
+            self.assertEqual([g.entry_dn for g in groups], list(self.rules['ldapbackend'].keys()))
+            self.assertEqual(list(catalog.load(('cn=db,ou=groups,dc=example,dc=org',)).keys()),
+                             ['cn=db,ou=groups,dc=example,dc=org'])
+            self.assertEqual(groups[0].cn.__str__(), 'NDA')
+
+            # Served from the catalog, without contacting LDAP.
+            mock_connect.reset_mock()
+            self.assertEqual(len(backend.groups), 4)
+            self.assertEqual(backend.get_permission('cn=db,ou=groups,dc=example,dc=org').name, 'db')
+            mock_connect.assert_not_called()
+
+            # Other processes read the catalog from Redis.
+            catalog._store({})
+            self.assertEqual(len(backend.groups), 4)
+            mock_connect.assert_not_called()
+
+            catalog.invalidate()
+            self.assertEqual(len(backend.groups), 4)
+            mock_connect.assert_called_once()
+        catalog.invalidate()
@@ -0,0 +1,59 @@
+from unittest.mock import Mock
+
+from django.test import TestCase
+
+from ldapbackend.exceptions import LDAPPoolTimeout
+from ldapbackend.pool import LDAPConnectionPool
+
+
+def connection_factory():
+    connection = Mock()
+    connection.closed = False
+    connection.bound = True
+    return True, connection
+
+
+class LDAPConnectionPoolTest(TestCase):
+    def test_connection_reuse(self):
+        factory = Mock(side_effect=connection_factory)
+        pool = LDAPConnectionPool(factory, size=2, wait=0)
+
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(factory.call_count, 1)
+
+    def test_pool_size_limit(self):
+        pool = LDAPConnectionPool(connection_factory, size=1, wait=0)
+
+        connection = pool.acquire()
+        self.assertRaises(LDAPPoolTimeout, pool.acquire)
+
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+
+    def test_rebind_dead_connection(self):
+        pool = LDAPConnectionPool(connection_factory, size=1, wait=0)
+
+        connection = pool.acquire()
+        pool.release(connection)
+
+        # Simulate the server dropping the connection while idle.
+        connection.closed = True
+        connection.bound = False
+        connection.bind.return_value = True
+
+        self.assertIs(pool.acquire(), connection)
+        connection.bind.assert_called_once()
+
+    def test_thread_lease(self):
+        factory = Mock(side_effect=connection_factory)
+        pool = LDAPConnectionPool(factory, size=1, wait=0)
+
+        bound, connection = pool.create_connection()
+        self.assertTrue(bound)
+        self.assertIs(pool.create_connection()[1], connection)
+        self.assertEqual(factory.call_count, 1)
+
+        pool.release_thread()
+        self.assertIs(pool.acquire(), connection)
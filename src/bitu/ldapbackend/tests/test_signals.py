@@ -1,7 +1,12 @@
+import bituldap
+
 from signups.models import Signup
 
 
+from io import StringIO
+
 from django.core import mail
+from django.core.management import call_command
 from django.db.models.signals import post_save
 from django.test import TestCase
 from unittest.mock import Mock, patch
@@ -51,3 +56,39 @@ class LDAPSignalTest(TestCase):
 
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, '[BITU] LDAP user created: test2')
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_batch_create(self, mock_connect):
+        signups = []
+        for uid in ('batch1', 'batch2', 'scott72'):
+            signup: Signup = Signup(username=uid.capitalize(), uid=uid, email=f'{uid}@example.com')
+            signup.save()
+            signup.set_password('password')
+            signups.append(signup)
+
+        with self.settings(ADMINS=['admin@example.com',]):
+            created = jobs.create_users(signups)
+
+        self.assertEqual(len(created), 2)
+        self.assertIsNotNone(bituldap.get_user('batch1'))
+        self.assertIsNotNone(bituldap.get_user('batch2'))
+
+        staff = bituldap.get_group('staff')
+        for dn in created:
+            self.assertIn(dn, staff.member)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, '[BITU] LDAP users created: 2')
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_batch_create_command(self, mock_connect):
+        # Activated without signals, as for an import.
+        signup: Signup = Signup(username='Batch3', uid='batch3', email='batch3@example.com')
+        signup.save()
+        signup.set_password('password')
+        Signup.objects.filter(pk=signup.pk).update(is_active=True)
+
+        out = StringIO()
+        call_command('create_users', '--uid=batch3', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Queued 1 signups in 1 jobs')
+        self.assertIsNotNone(bituldap.get_user('batch3'))
@@ -6,7 +6,7 @@ import bituldap
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from ldapbackend import helpers, jobs
+from ldapbackend import helpers, jobs, sshkeys
 
 from . import dummy_ldap
 
@@ -194,3 +194,30 @@ class LDAPSSHPublicKeyTest(TestCase):
         SSHKey.objects.create(user=user, ssh_public_key=key2, system='ldapbackend', active=True)
         self.assertEqual(user.ssh_keys.count(), 1)
         self.assertTrue(user.ssh_keys.first().ssh_public_key.startswith('ssh-rsa'))
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_reconcile_diff(self, mock_connect):
+        user, _ = User.objects.get_or_create(username='wwaller')
+        ldap = bituldap.get_user(user.get_username())
+        ldap.sshPublicKey = [self.test_key1]
+        ldap.entry_commit_changes()
+
+        diff = sshkeys.reconcile(user)
+        self.assertEqual(len(diff.imported), 1)
+        self.assertFalse(diff.added or diff.removed or diff.deactivated)
+        self.assertTrue(user.ssh_keys.get().active)
+
+        # Deactivate in Bitu, without triggering signals, and push the change to LDAP.
+        user.ssh_keys.update(active=False)
+        key = SSHKey(user=user, ssh_public_key=self.test_key2, system='ldapbackend', active=True)
+        key.clean()
+        SSHKey.objects.bulk_create([key])
+
+        diff = sshkeys.reconcile(user, push=True)
+        self.assertEqual(len(diff.removed), 1)
+        self.assertEqual(len(diff.added), 1)
+        self.assertFalse(diff.imported)
+
+        ldap = bituldap.get_user(user.get_username())
+        self.assertEqual(ldap.sshPublicKey.values, [self.test_key2.encode('utf8')])
+        self.assertFalse(sshkeys.reconcile(user, push=True).changed)
@@ -0,0 +1,142 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Allocation of UID numbers for new users.
+
+bituldap.next_uid_number() searches the directory for the highest UID number
+in use, which is both slow and racy when multiple RQ workers create users at
+the same time. When enabled, UID numbers are instead reserved from a counter
+in the Redis instance used by RQ. The counter is seeded from LDAP once, and
+is then updated atomically, so each number is handed out exactly once,
+regardless of the number of workers.
+
+.. code-block:: python
+
+   BITU_SUB_SYSTEMS = {
+     'ldapbackend': {
+       ...
+       'uid_allocator': True,
+       'uid_ranges': [{'min': 1000, 'max': 20000}, {'min': 1000000, 'max': 1999999}],
+     }
+   }
+
+Numbers are allocated from the configured uid_ranges, in order of their
+minimum value, moving to the next range once a range is exhausted. As the
+counter is not rechecked against LDAP, Bitu must be the only system
+allocating UID numbers in the configured ranges, or the counter must be
+reseeded using: ./manage.py uid_numbers --seed
+"""
+import logging
+
+from typing import Optional
+
+import bituldap
+import django_rq
+
+from django.conf import settings
+
+from .exceptions import UIDRangeException
+
+
+logger = logging.getLogger('bitu')
+
+COUNTER_KEY = 'ldap:uid:next'
+
+
+def enabled() -> bool:
+    return settings.BITU_SUB_SYSTEMS.get('ldapbackend', {}).get('uid_allocator', False)
+
+
+def _ranges() -> list[dict[str, int]]:
+    ranges = settings.BITU_SUB_SYSTEMS.get('ldapbackend', {}).get('uid_ranges', [])
+    return sorted(ranges, key=lambda r: r['min'])
+
+
+def _allocate(next_uid: int, count: int, ranges: list[dict[str, int]]) -> tuple[list[int], int]:
+    if not ranges:
+        return list(range(next_uid, next_uid + count)), next_uid + count
+
+    uids: list[int] = []
+    for uid_range in ranges:
+        if len(uids) == count:
+            break
+        if next_uid > uid_range['max']:
+            continue
+
+        next_uid = max(next_uid, uid_range['min'])
+        take = min(count - len(uids), uid_range['max'] - next_uid + 1)
+        uids.extend(range(next_uid, next_uid + take))
+        next_uid += take
+
+    if len(uids) < count:
+        raise UIDRangeException(f"uid ranges exhausted, requested: {count}, available: {len(uids)}, ranges: {ranges}")
+    return uids, next_uid
+
+
+def seed(force: bool = False) -> int:
+    """Initialize the counter from LDAP.
+
+    Args:
+        force (bool, optional): Overwrite an existing counter. Defaults to False.
+
+    Returns:
+        int: The next UID number to be allocated.
+    """
+    redis = django_rq.get_connection('default')
+    next_uid = bituldap.next_uid_number()
+    if force:
+        redis.set(COUNTER_KEY, next_uid)
+    elif not redis.set(COUNTER_KEY, next_uid, nx=True):
+        next_uid = int(redis.get(COUNTER_KEY))
+    return next_uid
+
+
+def reserve(count: int = 1) -> list[int]:
+    """Atomically reserve a block of UID numbers.
+
+    Args:
+        count (int, optional): Number of UID numbers to reserve. Defaults to 1.
+
+    Raises:
+        UIDRangeException: The configured ranges do not have room for count numbers.
+                           No numbers are reserved in that case.
+
+    Returns:
+        list[int]: Reserved UID numbers, ascending.
+    """
+    redis = django_rq.get_connection('default')
+    if redis.get(COUNTER_KEY) is None:
+        seed()
+
+    ranges = _ranges()
+    reserved: list[int] = []
+
+    def allocate(pipe) -> None:
+        # Runs under WATCH, if another worker updates the counter before
+        # the transaction is executed, the allocation is retried.
+        uids, next_uid = _allocate(int(pipe.get(COUNTER_KEY)), count, ranges)
+        pipe.multi()
+        pipe.set(COUNTER_KEY, next_uid)
+        reserved[:] = uids
+
+    redis.transaction(allocate, COUNTER_KEY)
+    return reserved
+
+
+def capacity() -> list[dict[str, Optional[int]]]:
+    """Remaining UID numbers in each configured range.
+
+    Returns:
+        list[dict]: min, max and remaining for each range, remaining is None
+                    for an unbounded allocation without ranges.
+    """
+    value = django_rq.get_connection('default').get(COUNTER_KEY)
+    next_uid = int(value) if value is not None else bituldap.next_uid_number()
+
+    ranges = _ranges()
+    if not ranges:
+        return [{'min': next_uid, 'max': None, 'remaining': None}]
+
+    return [{
+        'min': r['min'],
+        'max': r['max'],
+        'remaining': max(0, r['max'] - max(next_uid, r['min']) + 1),
+    } for r in ranges]
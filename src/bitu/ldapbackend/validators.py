@@ -5,6 +5,8 @@ import re
 
 import bituldap as b
 
+from . import directory
+
 from django.conf import settings
 from django.core import validators
 from django.forms import ValidationError
@@ -27,7 +29,7 @@ def LDAPUsernameValidator(username: str):
     """
 
     try:
-        user = b.get_user(username)
+        user = directory.get_user(username)
     except Exception as e:
         logger.warning(f"LDAP username validation error; username: {username}; {e}")
         raise ValidationError(
@@ -122,7 +124,8 @@ class LDAPPasswordValidator:
 
 
 def ldap_password_verification(username: str, password: str):
-    ldap_user = b.get_user(username)
+    # Always verify against the live entry, password hashes are never cached.
+    ldap_user = directory.get_user(username, writable=True)
 
     # We're using passlib to verify the password, but in some cases the
     # password hash has been stored in LDAP prefixed with {ssha}. Passlib
@@ -1,8 +1,9 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 
 
-from .signals import permission_audit, permission_validation, request_notification, request_validation
+from .signals import (pending_count_log, pending_count_request, permission_audit, permission_validation,
+                      request_notification, request_validation)
 
 
 class PermissionsConfig(AppConfig):
@@ -11,7 +12,15 @@ class PermissionsConfig(AppConfig):
 
     def ready(self) -> None:
         from permissions.models import Log, PermissionRequest
+        from permissions.rules import access_rules
         post_save.connect(permission_audit, Log)
         post_save.connect(permission_validation, Log)
         post_save.connect(request_notification, PermissionRequest)
         post_save.connect(request_validation, PermissionRequest)
+        post_save.connect(pending_count_request, PermissionRequest)
+        post_delete.connect(pending_count_request, PermissionRequest)
+        post_save.connect(pending_count_log, Log)
+        post_delete.connect(pending_count_log, Log)
+
+        # Compile the access request rules once, at startup.
+        access_rules()
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""State shared by the validators during a single evaluation.
+
+Listing the permissions available to a user runs the prevalidation rules of
+every configured permission, and many rules need the same LDAP user entry and
+group memberships. A ValidationContext loads those once, and memoizes the
+outcome of each distinct rule, for the duration of one evaluation.
+
+Validators get the context of the request they are validating using
+ValidationContext.for_request(), which returns a new context if the validator
+is called directly, rather than through ValidationContext.evaluate().
+"""
+import json
+
+from functools import cached_property
+from typing import TYPE_CHECKING, Union
+
+from django.db.models import Count, Q
+from django.utils.module_loading import import_string
+
+
+if TYPE_CHECKING:
+    from ldap3 import Entry
+
+    from ldapbackend.directory import CachedEntry
+
+    from .models import PermissionRequest
+
+
+class ValidationContext():
+    def __init__(self, user) -> None:
+        self.user = user
+        self._results: dict[tuple[str, str], tuple[bool, bool]] = {}
+        self._decisions: dict = {}
+
+    @classmethod
+    def for_request(cls, permission_request: 'PermissionRequest') -> 'ValidationContext':
+        context = getattr(permission_request, '_validation_context', None)
+        return context if context is not None else cls(permission_request.user)
+
+    @cached_property
+    def ldap_entry(self) -> Union['Entry', 'CachedEntry', None]:
+        # The LDAP backend is imported when first used, as permissions must
+        # load without it, e.g. if it is not in BITU_SUB_SYSTEMS.
+        from ldapbackend import directory
+
+        return directory.get_user(self.user.get_username())
+
+    @cached_property
+    def group_dns(self) -> set[str]:
+        from ldapbackend import membership
+
+        if not self.ldap_entry:
+            return set()
+        return membership.group_dns(self.ldap_entry.entry_dn)
+
+    def decisions(self, permission_request: 'PermissionRequest') -> dict[str, tuple[int, int]]:
+        """Approvals and rejections logged for a request, by manager, read using
+        a single aggregated query shared by all manager rules.
+
+        Args:
+            permission_request (PermissionRequest): Request being validated
+
+        Returns:
+            dict[str, tuple[int, int]]: Number of approvals and rejections, by username.
+        """
+        if permission_request.pk not in self._decisions:
+            rows = permission_request.log_set.values('created_by__username').annotate(
+                approvals=Count('id', filter=Q(approved=True)),
+                rejections=Count('id', filter=Q(approved=False)))
+            self._decisions[permission_request.pk] = {
+                row['created_by__username']: (row['approvals'], row['rejections']) for row in rows
+            }
+        return self._decisions[permission_request.pk]
+
+    def evaluate(self, permission_request: 'PermissionRequest', rule: dict) -> tuple[bool, bool]:
+        """Run the validator of a rule, once per distinct rule.
+
+        Args:
+            permission_request (PermissionRequest): Request to validate
+            rule (dict): Rule configuration, from ACCESS_REQUEST_RULES
+
+        Returns:
+            tuple[bool, bool]: approved and processed, see permissions.validators.
+        """
+        key = (rule['module'], json.dumps(rule, sort_keys=True, default=str))
+        if key not in self._results:
+            validator = import_string(rule['module'])
+            # The context is only attached to the request while the validator runs.
+            previous = getattr(permission_request, '_validation_context', None)
+            permission_request._validation_context = self
+            try:
+                self._results[key] = validator(permission_request, **rule)
+            finally:
+                permission_request._validation_context = previous
+        return self._results[key]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permissions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='permissionrequest',
+            index=models.Index(fields=['status', 'system', 'key'], name='permissionrequest_pending_idx'),
+        ),
+    ]
@@ -2,13 +2,17 @@
 
 import uuid
 
+from typing import Iterable, Optional
+
 import structlog
 
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import OuterRef, Q, QuerySet, Subquery
 from django.utils.translation import gettext_lazy as _
-from django.utils.module_loading import import_string
+
+from .context import ValidationContext
+from .rules import access_rules
 
 
 audit = structlog.getLogger('audit')
@@ -34,29 +38,18 @@ class Permission(object):
         Returns:
             bool: Configured, True/False
         """
-        if not hasattr(settings, 'ACCESS_REQUEST_RULES'):
-            return False
+        return access_rules().is_configured(self.source, self.key)
 
-        if self.source not in settings.ACCESS_REQUEST_RULES:
-            return False
-
-        if self.key not in settings.ACCESS_REQUEST_RULES[self.source]:
-            return False
-
-        return True
-
-    def run_validators(self, user) -> bool:
+    def run_validators(self, user, context: Optional[ValidationContext] = None) -> bool:
         if not self.configured:
             return False
-        rules = [
-            rule for rule in settings.ACCESS_REQUEST_RULES[
-                self.source][self.key] if rule.get('prevalidate', False)]
+        rules = access_rules().prevalidation_rules(self.source, self.key)
 
         request = PermissionRequest()
         request.user = user
+        context = context or ValidationContext(user)
         for rule in rules:
-            m = import_string(rule['module'])
-            approved, processed = m(request, **rule)
+            approved, processed = context.evaluate(request, rule)
             if not approved:
                 return False
         return True
@@ -83,9 +76,16 @@ class Permission(object):
 
     @property
     def request(self):
-        return PermissionRequest.objects.filter(user=self.user,
-                                                system=self.source,
-                                                key=self.key).order_by('-created').first()
+        # The latest request may have been loaded in bulk, see PermissionRequest.latest_for().
+        if '_request' not in self.__dict__:
+            self._request = PermissionRequest.objects.filter(user=self.user,
+                                                             system=self.source,
+                                                             key=self.key).order_by('-created').first()
+        return self._request
+
+    @request.setter
+    def request(self, value):
+        self._request = value
 
 
 class PermissionRequest(models.Model):
@@ -116,6 +116,50 @@ class PermissionRequest(models.Model):
                               help_text=_(
                                   'Phabricator task with access request, alternatively provide reasoning below'))
 
+    @classmethod
+    def pending_for(cls, permissions: Iterable[tuple[str, str]]) -> QuerySet:
+        """Pending requests for any of the given permissions, using a single query.
+
+        Args:
+            permissions (Iterable[tuple[str, str]]): (system, key) pairs.
+
+        Returns:
+            QuerySet: PermissionRequests
+        """
+        query = Q()
+        for system, key in set(permissions):
+            query |= Q(system=system, key=key)
+        if not query:
+            return cls.objects.none()
+        return cls.objects.filter(query, status=cls.PENDING)
+
+    @classmethod
+    def latest_for(cls, user, permissions: Iterable[tuple[str, str]]) -> dict[tuple[str, str], 'PermissionRequest']:
+        """The latest request by a user for each of the given permissions, using a single query.
+
+        Args:
+            user (User): Requesting user
+            permissions (Iterable[tuple[str, str]]): (system, key) pairs.
+
+        Returns:
+            dict[tuple[str, str], PermissionRequest]: Requests by (system, key), permissions
+                                                      never requested are left out.
+        """
+        permissions = set(permissions)
+        if not permissions:
+            return {}
+
+        latest = cls.objects.filter(
+            user=user,
+            system=OuterRef('system'),
+            key=OuterRef('key')).order_by('-created').values('pk')[:1]
+        requests = cls.objects.filter(
+            user=user,
+            system__in={p[0] for p in permissions},
+            key__in={p[1] for p in permissions},
+            pk=Subquery(latest))
+        return {(r.system, r.key): r for r in requests if (r.system, r.key) in permissions}
+
     @property
     def permission(self):
         from .permission import permission_set
@@ -123,13 +167,13 @@ class PermissionRequest(models.Model):
 
     @property
     def rules(self):
-        return getattr(settings, 'ACCESS_REQUEST_RULES', {}).get(self.system, {}).get(self.key, [])
+        return access_rules().rules_for(self.system, self.key)
 
-    def validate(self):
+    def validate(self, context: Optional[ValidationContext] = None):
+        context = context or ValidationContext(self.user)
         process_count = 0
         for rule in self.rules:
-            validator = import_string(rule['module'])
-            approved, processed = validator(self, **rule)
+            approved, processed = context.evaluate(self, rule)
             if not processed:
                 continue
 
@@ -178,6 +222,11 @@ class PermissionRequest(models.Model):
     def __str__(self):
         return f"({self.id}) - {self.get_status_display() } - {self.system}|{self.key}; requested on: {self.created} by {self.user.get_username()}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'system', 'key'], name='permissionrequest_pending_idx'),
+        ]
+
 
 
 class Log(models.Model):
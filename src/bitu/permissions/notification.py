@@ -2,8 +2,6 @@ import logging
 
 from typing import TYPE_CHECKING, Iterator
 
-import bituldap
-
 from django_rq import job
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
@@ -12,6 +10,10 @@ from django.template.loader import get_template
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from ldapbackend import directory
+
+from .rules import access_rules
+
 
 if TYPE_CHECKING:
     from .models import PermissionRequest
@@ -39,12 +41,12 @@ def get_user_dns_from_ldap_group(group_dns: list[str]) -> set[str]:
     Returns:
         set[str]: set of user DNs
     """
-    members = []
-    for cn in group_dns:
-        # Get group name from DN
-        name = cn.split(',')[0].split('=')[1]
-        members.extend([m for m in bituldap.get_group(name).member])
+    # Get group names from DNs
+    names = [cn.split(',')[0].split('=')[1] for cn in group_dns]
 
+    members = []
+    for group in directory.get_groups(names, attributes=['member']):
+        members.extend(group.entry_attributes_as_dict.get('member', []))
 
     # Convert to set to strip duplicates.
     return set(members)
@@ -52,18 +54,11 @@ def get_user_dns_from_ldap_group(group_dns: list[str]) -> set[str]:
 
 def get_notification_email_for_users(users: Iterator[str]) -> set[str]:
     emails = []
-    for user in users:
-        # Get uid from DN
-        uid = user.split(',')[0][4:]
-
-        user = bituldap.get_user(uid)
-        if user is None:
-            continue
-
+    for user in directory.get_users_by_dn(users, attributes=['mail']):
         # Because we're going to convert the resulting list to a set, get
         # the value/email as a string, rather than a Writeable/Readable LDAP
         # attribute, which cannot be hashed and automatically converted to a set.
-        emails.append(user.mail.value)
+        emails.extend(user.entry_attributes_as_dict.get('mail', [])[:1])
     return set(emails)
 
 
@@ -76,14 +71,13 @@ def get_manager_emails(request: 'PermissionRequest') -> set[str]:
     Returns:
         set[str]: email for approving managers.
     """
-    managers = []
-    rules = settings.ACCESS_REQUEST_RULES.get(request.system, {}).get(request.key, [])
-    for rule in rules:
-        managers.extend(rule.get('notify', []))
-        manager_dns = get_user_dns_from_ldap_group(rule.get('notify_group', []))
-        managers.extend(get_notification_email_for_users(manager_dns))
+    emails, group_dns = access_rules().notify_targets(request.system, request.key)
+    managers = set(emails)
+    if group_dns:
+        manager_dns = get_user_dns_from_ldap_group(group_dns)
+        managers.update(get_notification_email_for_users(manager_dns))
 
-    return set(managers)
+    return managers
 
 
 def get_permission_for_manager(username: str) -> list[set[str, str]]:
@@ -97,13 +91,7 @@ def get_permission_for_manager(username: str) -> list[set[str, str]]:
                              each set has a system as index zero
                              and the permission key and index one.
     """
-    permissions = []
-    for system, backend in settings.ACCESS_REQUEST_RULES.items():
-        for key, rules in backend.items():
-            for rule in rules:
-                if username in rule.get('managers', []):
-                    permissions.append((system, key))
-    return permissions
+    return access_rules().permissions_for_manager(username)
 
 
 def get_pending_requests(username: str) -> QuerySet:
@@ -115,21 +103,8 @@ def get_pending_requests(username: str) -> QuerySet:
     Returns:
         QuerySet: PermissionRequests as a Django queryset.
     """
-    from .permission import PermissionRequest
-    permissions = get_permission_for_manager(username)
-    requests = []
-
-    # A little hacky: Iterate over all the permissions managed by that username,
-    # build a list of PermissionRequest IDs currently pending for those system/key
-    # combinations. Then use those IDs to get a deduplicated QuerySet.
-    for permission in permissions:
-        requests.extend(PermissionRequest.objects.filter(
-            system=permission[0],
-            key=permission[1],
-            status=PermissionRequest.PENDING).values_list('id', flat=True))
-
-    # Filter out all none pending requests.
-    return PermissionRequest.objects.filter(id__in=requests, status=PermissionRequest.PENDING)
+    from .models import PermissionRequest
+    return PermissionRequest.pending_for(set(access_rules().permissions_for_manager(username)))
 
 
 @job('notification')
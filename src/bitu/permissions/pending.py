@@ -0,0 +1,94 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Cached number of permission requests pending approval, per manager.
+
+The count is shown in the navigation on every page rendered for a manager.
+When enabled, the count is kept in the Redis instance used by RQ and only
+recomputed after a request, or a log entry for a request, managed by the
+manager is changed, or once the TTL expires:
+
+.. code-block:: python
+
+   ACCESS_REQUEST_PENDING_COUNT_TTL = 300  # Seconds, 0 disables the cache.
+"""
+import logging
+
+from typing import NewType, TYPE_CHECKING
+
+import django_rq
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .rules import access_rules
+
+
+if TYPE_CHECKING:
+    from django.contrib.auth import get_user_model
+    User = NewType('User', get_user_model())
+
+logger = logging.getLogger('bitu')
+
+
+def _ttl() -> int:
+    return getattr(settings, 'ACCESS_REQUEST_PENDING_COUNT_TTL', 0)
+
+
+def _key(username: str) -> str:
+    return f'permissions:pending:{username}'
+
+
+def pending_count(user: 'User') -> int:
+    """Number of permission requests pending approval by the user.
+
+    Args:
+        user (User): Django user object
+
+    Returns:
+        int: Pending requests, zero for users not managing any permissions.
+    """
+    from .permission import permission_set
+
+    username = user.get_username()
+    if not access_rules().is_manager(username):
+        return 0
+
+    ttl = _ttl()
+    if not ttl:
+        return permission_set.get_pending(user).count()
+
+    try:
+        redis = django_rq.get_connection('default')
+        count = redis.get(_key(username))
+        if count is not None:
+            return int(count)
+    except RedisError as e:
+        logger.warning(f'pending permission count cache unavailable, exception: {e}')
+        return permission_set.get_pending(user).count()
+
+    count = permission_set.get_pending(user).count()
+    try:
+        redis.set(_key(username), count, ex=ttl)
+    except RedisError:
+        pass
+    return count
+
+
+def invalidate(system: str, key: str) -> None:
+    """Drop the cached count for all managers of a permission.
+
+    Args:
+        system (str): Permission system, e.g. ldapbackend
+        key (str): Permission key
+    """
+    if not _ttl():
+        return
+
+    managers = access_rules().managers_for(system, key)
+    if not managers:
+        return
+
+    try:
+        django_rq.get_connection('default').delete(*[_key(m) for m in managers])
+    except RedisError as e:
+        # Counts may be stale until the TTL expires.
+        logger.error(f'failed to invalidate pending permission counts, system: {system}, key: {key}, exception: {e}')
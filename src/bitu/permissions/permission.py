@@ -1,10 +1,13 @@
-from typing import NewType, Union
+from dataclasses import dataclass, field
+from typing import NewType, Optional, Union
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models.query import QuerySet
 from django.utils.module_loading import import_string
-from .models import Permission, PermissionRequest, Log as PermissionLog
+from .models import Permission, PermissionRequest
+from .context import ValidationContext
+from .rules import access_rules
 
 User = NewType('User', get_user_model())
 
@@ -45,6 +48,20 @@ class BaseBackend():
         """
         raise NotImplementedError()
 
+    def permissions(cls, user: 'User') -> tuple[list[Permission], list[Permission]]:
+        """Return both the existing and the available permissions of a user.
+
+        Backends should override this method if both lists can be computed in
+        a single pass, rather than one pass per list.
+
+        Args:
+            user (User): Bitu User Object
+
+        Returns:
+            tuple[list[Permission], list[Permission]]: Existing and available permissions.
+        """
+        return cls.existing_permissions(user), cls.available_permissions(user)
+
     def get_permission(cls, key: str) -> Union[Permission, None]:
         """Return a single permission by key.
 
@@ -92,12 +109,16 @@ class PermissionSet(BaseBackend):
 
             self._backends[k] = import_string(v['permissions'])()
 
-    def filter_permissions(self, permissions: list[Permission], user: 'User') -> list[Permission]:
+    def filter_permissions(self, permissions: list[Permission], user: 'User',
+                           context: Optional[ValidationContext] = None) -> list[Permission]:
         filtered: list[Permission] = []
+        # All permissions are validated for the same user, share LDAP lookups
+        # and the outcome of identical rules.
+        context = context or ValidationContext(user)
         for permission in permissions:
             if not permission.configured:
                 continue
-            if not permission.run_validators(user):
+            if not permission.run_validators(user, context):
                 continue
             filtered.append(permission)
         return filtered
@@ -115,23 +136,55 @@ class PermissionSet(BaseBackend):
         [permissions.extend(b.existing_permissions(user)) for b in self._backends.values()]
         return self.filter_permissions(permissions, user)
 
+    def overview(self, user: 'User') -> 'PermissionOverview':
+        """Existing, available and pending permissions of a user, from a single
+        pass over each backend. Use this rather than calling available_permissions()
+        and existing_permissions() separately.
+
+        Args:
+            user (User): Bitu User Object
+
+        Returns:
+            PermissionOverview: Permissions of the user.
+        """
+        existing: list[Permission] = []
+        available: list[Permission] = []
+        for backend in self._backends.values():
+            backend_existing, backend_available = backend.permissions(user)
+            existing.extend(backend_existing)
+            available.extend(backend_available)
+
+        context = ValidationContext(user)
+        return PermissionOverview(
+            existing=self.filter_permissions(existing, user, context),
+            available=self.filter_permissions(available, user, context))
+
     def get_permission(self, system: str, key: str) -> Union[Permission, None]:
         return self._backends[system].get_permission(key)
 
     def get_pending(self, user: User) -> QuerySet[PermissionRequest]:
-        # Find all the rules which require approval of a manager and extract the id of
-        # the pending PermissionRequest for that permission.
-        requests = []
-        for system, rule_sets in settings.ACCESS_REQUEST_RULES.items():
-            for key, rules in rule_sets.items():
-                for rule in rules:
-                    if user.get_username() in rule.get('managers', []):
-                        requests.extend(PermissionRequest.objects.filter(system=system, key=key, status=PermissionRequest.PENDING).values_list('id', flat=True))
-
-        # Get all the log objects for the current pending requests made by the current user.
-        # Use the list of logs to exclude permissions we already approved.
-        logs = PermissionLog.objects.filter(request__id__in=requests, created_by=user)
-        return PermissionRequest.objects.filter(id__in=requests).exclude(log__in=logs)
+        # Find the pending requests for all permissions managed by the user, excluding
+        # requests the user already approved or rejected.
+        permissions = set(access_rules().permissions_for_manager(user.get_username()))
+        return PermissionRequest.pending_for(permissions).exclude(log__created_by=user)
+
+
+@dataclass
+class PermissionOverview:
+    existing: list[Permission] = field(default_factory=list)
+    available: list[Permission] = field(default_factory=list)
+
+    @property
+    def pending(self) -> list[Permission]:
+        """Available permissions requested by the user, awaiting approval."""
+        return [p for p in self.available if p.state == PermissionRequest.PENDING]
+
+    def get(self, system: str, key: str) -> Optional[Permission]:
+        """Find an available permission."""
+        for permission in self.available:
+            if permission.source == system and permission.key == key:
+                return permission
+        return None
 
 
 permission_set = PermissionSet()
@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Compiled index of the ACCESS_REQUEST_RULES setting.
+
+The rules are configured as a nested dictionary, system -> permission key ->
+list of rules, but are mostly queried the other way around, e.g. which
+permissions can a given manager approve. Rather than walking the settings
+on every call, the rules are compiled once, into lookup tables, and
+recompiled if the setting is changed, e.g. by tests.
+
+.. code-block:: python
+
+   from permissions.rules import access_rules
+
+   access_rules().is_manager('wwaller')
+   access_rules().permissions_for_manager('wwaller')
+"""
+from typing import Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+Permission = tuple[str, str]
+
+
+class AccessRules():
+    def __init__(self, rules: dict[str, dict[str, list[dict]]]) -> None:
+        self.systems: dict[str, tuple[str, ...]] = {}
+        self.rules: dict[Permission, tuple[dict, ...]] = {}
+        self.prevalidate: dict[Permission, tuple[dict, ...]] = {}
+        self.notify: dict[Permission, tuple[str, ...]] = {}
+        self.notify_groups: dict[Permission, tuple[str, ...]] = {}
+        # One entry per rule listing the manager, so a permission may be
+        # listed more than once.
+        self.managers: dict[str, list[Permission]] = {}
+        self.managed_by: dict[Permission, set[str]] = {}
+
+        for system, rule_sets in rules.items():
+            self.systems[system] = tuple(rule_sets.keys())
+            for key, rule_set in rule_sets.items():
+                permission = (system, key)
+                self.rules[permission] = tuple(rule_set)
+                self.prevalidate[permission] = tuple(r for r in rule_set if r.get('prevalidate', False))
+                self.notify[permission] = tuple(e for r in rule_set for e in r.get('notify', []))
+                self.notify_groups[permission] = tuple(g for r in rule_set for g in r.get('notify_group', []))
+                for rule in rule_set:
+                    for manager in rule.get('managers', []):
+                        self.managers.setdefault(manager, []).append(permission)
+                        self.managed_by.setdefault(permission, set()).add(manager)
+
+    def is_configured(self, system: str, key: str) -> bool:
+        return (system, key) in self.rules
+
+    def keys(self, system: str) -> tuple[str, ...]:
+        return self.systems.get(system, ())
+
+    def rules_for(self, system: str, key: str) -> tuple[dict, ...]:
+        return self.rules.get((system, key), ())
+
+    def prevalidation_rules(self, system: str, key: str) -> tuple[dict, ...]:
+        return self.prevalidate.get((system, key), ())
+
+    def notify_targets(self, system: str, key: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        """Email addresses and LDAP group DNs to notify of new requests for a permission."""
+        return self.notify.get((system, key), ()), self.notify_groups.get((system, key), ())
+
+    def is_manager(self, username: str) -> bool:
+        return username in self.managers
+
+    def permissions_for_manager(self, username: str) -> list[Permission]:
+        return list(self.managers.get(username, []))
+
+    def managers_for(self, system: str, key: str) -> set[str]:
+        return set(self.managed_by.get((system, key), set()))
+
+
+_access_rules: Optional[AccessRules] = None
+
+
+def access_rules() -> AccessRules:
+    global _access_rules
+    if _access_rules is None:
+        _access_rules = AccessRules(getattr(settings, 'ACCESS_REQUEST_RULES', {}) or {})
+    return _access_rules
+
+
+@receiver(setting_changed)
+def reset_access_rules(setting, **kwargs):
+    global _access_rules
+    if setting == 'ACCESS_REQUEST_RULES':
+        _access_rules = None
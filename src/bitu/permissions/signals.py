@@ -2,8 +2,11 @@ from typing import TYPE_CHECKING
 
 import structlog
 
+from django.db import transaction
+
 from .notification import (send_permission_request_email,
                            send_permission_status_change_email)
+from .pending import invalidate as invalidate_pending_count
 
 
 if TYPE_CHECKING:
@@ -33,6 +36,18 @@ def request_notification(sender, instance: 'PermissionRequest', created: bool, *
     send_permission_request_email(instance)
 
 
+def pending_count_request(sender, instance: 'PermissionRequest', **kwargs):
+    # Invalidate once committed, or the count may be recomputed from the
+    # previous state before the change is visible.
+    system, key = instance.system, instance.key
+    transaction.on_commit(lambda: invalidate_pending_count(system, key))
+
+
+def pending_count_log(sender, instance: 'Log', **kwargs):
+    system, key = instance.request.system, instance.request.key
+    transaction.on_commit(lambda: invalidate_pending_count(system, key))
+
+
 def permission_audit(sender, instance: 'Log', created: bool, **kwargs):
     if created:
         audit.info('log object created', id=instance.id, request=instance.request.id,
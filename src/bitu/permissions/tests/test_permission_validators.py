@@ -248,3 +248,62 @@ class PermissionRequestApprovalTest(TestCase):
             pr.refresh_from_db
 
             self.assertFalse(pr.status == pr.APPROVED)
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_shared_validation_context(self, mock_connect):
+        from permissions.models import Permission
+        from permissions.permission import permission_set
+
+        user = User(username='kevin48')
+        user.save()
+
+        rule = {
+            'module': 'permissions.validators.ldap_group_membership',
+            'group_dn': 'cn=staff,ou=groups,dc=example,dc=org',
+            'prevalidate': True
+        }
+        keys = ['cn=management,ou=groups,dc=example,dc=org', 'cn=www,ou=groups,dc=example,dc=org',
+                'cn=db,ou=groups,dc=example,dc=org']
+        rules = {'ldapbackend': {key: [rule] for key in keys}}
+
+        with self.settings(ACCESS_REQUEST_RULES=rules):
+            permissions = [Permission(source='ldapbackend', key=key) for key in keys]
+            with patch('bituldap.get_user', wraps=bituldap.get_user) as get_user, \
+                 patch('bituldap.member_of', wraps=bituldap.member_of) as member_of:
+                self.assertEqual(len(permission_set.filter_permissions(permissions, user)), 3)
+
+                # The user entry and groups are read once, for all permissions.
+                self.assertEqual(get_user.call_count, 1)
+                self.assertEqual(member_of.call_count, 1)
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_aggregated_manager_decisions(self, mock_connect):
+        from permissions.context import ValidationContext
+
+        user = User(username='coxsarah')
+        user.save()
+
+        with self.settings(ACCESS_REQUEST_RULES=self.rules):
+            pr = PermissionRequest(user=user)
+            pr.system = 'ldapbackend'
+            pr.key = 'cn=db,ou=groups,dc=example,dc=org'
+            pr.comment = 'Test access request'
+            pr.save()
+
+            PermissionLog(request=pr, created_by=self.manager1, comment='Approved', approved=True).save()
+            PermissionLog(request=pr, created_by=self.manager1, comment='Approved again', approved=True).save()
+            PermissionLog(request=pr, created_by=self.manager3, comment='Rejected', approved=False).save()
+
+            rules = [
+                {'module': 'permissions.validators.manager_approval',
+                 'managers': [self.manager1.get_username(), self.manager2.get_username()], 'count': 1},
+                {'module': 'permissions.validators.manager_approval',
+                 'managers': [self.manager1.get_username()], 'count': 2},
+                {'module': 'permissions.validators.manager_approval',
+                 'managers': [self.manager3.get_username()], 'count': 1},
+            ]
+
+            context = ValidationContext(user)
+            with self.assertNumQueries(1):
+                results = [context.evaluate(pr, rule) for rule in rules]
+            self.assertEqual(results, [(True, True), (False, False), (False, True)])
@@ -11,6 +11,7 @@ from accounts.models import User
 from ldapbackend.tests import dummy_ldap
 from permissions.models import PermissionRequest
 from permissions.models import Log as PermissionLog
+from permissions import pending
 from permissions.permission import permission_set
 
 
@@ -103,6 +104,68 @@ class PermissionRequestTest(TestCase):
         pending = permission_set.get_pending(self.admin).filter(pk=request.pk)
         self.assertEqual(0, pending.count())
 
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_pending_single_query(self, mock_connect):
+        request = PermissionRequest.objects.create(
+            user=self.user,
+            comment='Pending Test',
+            key='cn=NDA,ou=groups,dc=example,dc=org',
+            system='ldapbackend'
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(list(permission_set.get_pending(self.admin)), [request])
+
+        # Requests the manager has acted on are no longer pending for that manager.
+        PermissionLog.objects.create(request=request, created_by=self.admin, comment='Not yet', approved=False)
+        self.assertFalse(permission_set.get_pending(self.admin).exists())
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_overview(self, mock_connect):
+        request = PermissionRequest.objects.create(
+            user=self.user,
+            comment='Overview Test',
+            key='cn=NDA,ou=groups,dc=example,dc=org',
+            system='ldapbackend'
+        )
+
+        with patch('bituldap.member_of', wraps=bituldap.member_of) as member_of:
+            overview = permission_set.overview(self.user)
+            # Group memberships are read once, for all lists.
+            member_of.assert_called_once()
+
+        self.assertEqual([p.key for p in overview.pending], [request.key])
+        self.assertEqual(overview.get('ldapbackend', request.key).request, request)
+        self.assertEqual([p.key for p in overview.available],
+                         [p.key for p in permission_set.available_permissions(self.user)])
+        self.assertEqual([p.key for p in overview.existing],
+                         [p.key for p in permission_set.existing_permissions(self.user)])
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_pending_count_cache(self, mock_connect):
+        with self.settings(ACCESS_REQUEST_PENDING_COUNT_TTL=300):
+            pending.invalidate('ldapbackend', 'cn=NDA,ou=groups,dc=example,dc=org')
+            self.assertEqual(pending.pending_count(self.admin), 0)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                request = PermissionRequest.objects.create(
+                    user=self.user,
+                    comment='Pending Test',
+                    key='cn=NDA,ou=groups,dc=example,dc=org',
+                    system='ldapbackend'
+                )
+            self.assertEqual(pending.pending_count(self.admin), 1)
+            with self.assertNumQueries(0):
+                self.assertEqual(pending.pending_count(self.admin), 1)
+
+            # Non-managers never query the database.
+            with self.assertNumQueries(0):
+                self.assertEqual(pending.pending_count(self.user), 0)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                PermissionLog.objects.create(request=request, created_by=self.admin, comment='No', approved=False)
+            self.assertEqual(pending.pending_count(self.admin), 0)
+
     @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
     def test_reject_approve(self, mock_connect):
         # Create http client for requesting user permissions.
@@ -0,0 +1,48 @@
+from django.test import TestCase
+
+from permissions.rules import access_rules
+
+
+class AccessRulesTest(TestCase):
+    rules = {
+        'ldapbackend': {
+            'cn=NDA,ou=groups,dc=example,dc=org': [{
+                'module': 'permissions.validators.manager_approval',
+                'managers': ['glopez', 'yharris'],
+                'notify': ['www@example.com'],
+                'count': 2
+            }, {
+                'module': 'permissions.validators.email_domain',
+                'domain': 'example.com',
+                'prevalidate': True
+            }],
+            'cn=db,ou=groups,dc=example,dc=org': [{
+                'module': 'permissions.validators.manager_approval',
+                'managers': ['yharris'],
+                'notify_group': ['cn=db-manager,ou=groups,dc=example,dc=org'],
+                'count': 1
+            }],
+        }
+    }
+
+    def test_index(self):
+        with self.settings(ACCESS_REQUEST_RULES=self.rules):
+            rules = access_rules()
+            self.assertIs(rules, access_rules())
+
+            self.assertTrue(rules.is_manager('yharris'))
+            self.assertFalse(rules.is_manager('carol93'))
+            self.assertEqual(rules.permissions_for_manager('glopez'),
+                             [('ldapbackend', 'cn=NDA,ou=groups,dc=example,dc=org')])
+            self.assertEqual(len(rules.permissions_for_manager('yharris')), 2)
+
+            self.assertTrue(rules.is_configured('ldapbackend', 'cn=db,ou=groups,dc=example,dc=org'))
+            self.assertFalse(rules.is_configured('ldapbackend', 'cn=staff,ou=groups,dc=example,dc=org'))
+            self.assertEqual(len(rules.rules_for('ldapbackend', 'cn=NDA,ou=groups,dc=example,dc=org')), 2)
+            self.assertEqual(len(rules.prevalidation_rules('ldapbackend', 'cn=NDA,ou=groups,dc=example,dc=org')), 1)
+            self.assertEqual(rules.notify_targets('ldapbackend', 'cn=db,ou=groups,dc=example,dc=org'),
+                             ((), ('cn=db-manager,ou=groups,dc=example,dc=org',)))
+
+        # Changing the setting recompiles the index.
+        self.assertFalse(access_rules().is_manager('glopez'))
+        self.assertTrue(access_rules().is_manager('wwaller'))
@@ -1,4 +1,4 @@
-import bituldap
+from .context import ValidationContext
 
 # Validators take a permission request and kwargs, kwargs being the configuration from
 # the settings file. Validators return two booleans, approved and processed.
@@ -12,26 +12,19 @@ import bituldap
 def manager_approval(permission_request, **kwargs) -> tuple[bool, bool]:
     # This could be managed by a "unique_together" on a database level, but that also
     # limits testability.
-    # 1) Get all rejections, logs with the approved field set to false, created by
-    #    managers of this permission.
-    # 2) Count the number of rejections, any number of rejections, greater than zero
-    #    will be considered a rejection of the entire request.
-    rejections = permission_request.log_set.filter(
-        created_by__username__in=kwargs['managers'], approved=False
-        ).count()
-
-    if rejections:
+    # The approvals and rejections of all managers are read once per validation, shared
+    # by all manager rules, and evaluated in memory.
+    decisions = ValidationContext.for_request(permission_request).decisions(permission_request)
+    managers = [m for m in kwargs['managers'] if m in decisions]
+
+    # Any number of rejections, by managers of this permission, greater than zero
+    # will be considered a rejection of the entire request.
+    if any(decisions[m][1] for m in managers):
         return False, True
 
-    # Request is not rejected, check if it is approved:
-    # 1) Get all approvals, logs with the approved field set to true.
-    # 2) Get all the usernames of approvers.
-    # 3) Convert list of usernames to a set, to filter out duplicated (the same manager
-    #    approved the request multiple times).
-    approvals = set(
-        permission_request.log_set.filter(
-            created_by__username__in=kwargs['managers'], approved=True
-        ).values_list('created_by__username', flat=True))
+    # Request is not rejected, check if it is approved. Managers who approved the
+    # request multiple times are only counted once.
+    approvals = {m for m in managers if decisions[m][0]}
 
     # The request must be approved by at least the number of managers specified in the configuration.
     approved = len(approvals) >= kwargs['count']
@@ -44,7 +37,7 @@ def manager_approval(permission_request, **kwargs) -> tuple[bool, bool]:
 
 
 def ldap_attribute(permission_request, **kwargs) -> tuple[bool, bool]:
-    entry = bituldap.get_user(permission_request.user.get_username())
+    entry = ValidationContext.for_request(permission_request).ldap_entry
     if not entry:
         return False, True
 
@@ -66,7 +59,7 @@ def email_domain(permission_request, **kwargs):
     # Get email address from LDAP, to avoid sync errors.
     # This can also be implemented using ldap_attribute, but here we
     # ensure that the @ is included.
-    entry = bituldap.get_user(permission_request.user.get_username())
+    entry = ValidationContext.for_request(permission_request).ldap_entry
     return entry.mail.__str__().endswith(f'@{kwargs["domain"]}'), True
 
 
@@ -88,10 +81,4 @@ def ldap_group_membership(permission_request, **kwargs) -> tuple[bool, bool]:
                            be true for this validator, as the validation is a simple
                            membership check.
     """
-    entry = bituldap.get_user(permission_request.user.get_username())
-    groups = bituldap.member_of(entry.entry_dn)
-    required_group = kwargs["group_dn"]
-    for group in groups:
-        if group.entry_dn == required_group:
-            return True, True
-    return False, True
+    return kwargs["group_dn"] in ValidationContext.for_request(permission_request).group_dns, True
@@ -21,10 +21,9 @@ class MyPermissionView(TemplateView):
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        context['permissions'] = sorted(
-            permission_set.available_permissions(self.request.user), key=lambda x: x.name.__str__().lower())
-        context['my_permissions'] = sorted(
-            permission_set.existing_permissions(self.request.user), key=lambda x: x.name.__str__().lower())
+        overview = permission_set.overview(self.request.user)
+        context['permissions'] = sorted(overview.available, key=lambda x: x.name.__str__().lower())
+        context['my_permissions'] = sorted(overview.existing, key=lambda x: x.name.__str__().lower())
         context['logs'] = PermissionLog.objects.filter(request__user=self.request.user).order_by('-created')
         return context
 
@@ -52,9 +51,8 @@ class PermissionRequestView(CreateView):
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        permission = permission_set.get_permission(self.kwargs['system'], self.kwargs['key'])
-        available = permission_set.available_permissions(self.request.user)
-        if not permission or permission not in available:
+        permission = permission_set.overview(self.request.user).get(self.kwargs['system'], self.kwargs['key'])
+        if not permission:
             raise Http404
 
         context['permission'] = permission
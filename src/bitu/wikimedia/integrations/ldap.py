@@ -3,17 +3,28 @@ import logging
 import bituldap
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.utils import timezone
 from ldap3 import (SUBTREE, MODIFY_REPLACE, MODIFY_DELETE,
                    Connection, ObjectDef, Reader)
 from ldap3.core.exceptions import LDAPBindError
 from ldap3.utils.conv import escape_filter_chars
 
+from ldapbackend import directory
+
 
 logger = logging.getLogger('bitu')
 
 
 class LDAP():
+    def _set_active(self, uid: str, active: bool):
+        # Keep the Bitu account in line with the LDAP block, SSH keys of
+        # inactive users are not exported.
+        user = get_user_model().objects.filter(username=uid).first()
+        if user is not None and user.is_active != active:
+            user.is_active = active
+            user.save(update_fields=['is_active'])
+
     def _user_definition(self, conn: Connection) -> ObjectDef:
         """Get object definition of LDAP3 query.
         The object definition will be used to map attributes onto the Entry objects.
@@ -65,9 +76,9 @@ class LDAP():
         return reader
 
     def unset_email(self, uid: str):
-        entry: bituldap.Entry = bituldap.get_user(uid)
+        entry: bituldap.Entry = directory.get_user(uid, writable=True)
         entry.mail = ''
-        entry.entry_commit_changes()
+        directory.commit(entry)
 
     def block_user(self, uid: str):
         entry = self.fetch_entry(uid)
@@ -82,6 +93,10 @@ class LDAP():
         if not success:
             logger.error(f'ldap, account blocked failed, username: {uid}, locktime: {timestamp}')
             raise Exception(f'ldap, failed to block user, username: {uid}')
+
+        # Modified using a raw query, drop any cached copy of the entry.
+        directory.invalidate(uid=uid, dn=entry['dn'])
+        self._set_active(uid, False)
         logger.info(f'ldap, account blocked, username: {uid}, locktime: {timestamp}')
 
     def unblock_user(self, uid: str):
@@ -127,4 +142,6 @@ class LDAP():
                 logger.error(f'ldap, account unblocked failed, could not delete pwdPolicySubentry, username: {uid}')
                 raise Exception(f'ldap, failed to unblock user, username: {uid}')
 
+        directory.invalidate(uid=uid, dn=entry['dn'])
+        self._set_active(uid, True)
         logger.info(f'ldap, account unblocked, username: {uid}')
@@ -17,6 +17,8 @@ from django.utils.translation import gettext as _
 from django_rq import job
 from ldap3 import Entry
 
+from ldapbackend import directory
+
 from .integrations import gitlab, gerrit, ldap, phabricator
 from .models import UserBlockEventLog
 from .tokens import default_token_generator
@@ -27,16 +29,14 @@ User = get_user_model()
 
 @job
 def update_ldap_attributes(user: 'User', attributes:Dict):
-    ldap_user = bituldap.get_user(user.get_username())
+    ldap_user = directory.get_user(user.get_username(), writable=True)
     if not ldap_user:
         logger.warning(f'user: {user.get_username()} not found in ldap')
         return
 
-    for k, v in attributes.items():
-        setattr(ldap_user, k, v)
-        ldap_user.entry_commit_changes()
-
-    logger.info(f'update ldap user: {ldap_user} with attributes: {attributes}')
+    changed = directory.update_attributes(ldap_user, attributes)
+    logger.info(f'update ldap user: {ldap_user.entry_dn} with attributes: {attributes}, changed: {changed}')
+    return changed
 
 
 @job('notification')
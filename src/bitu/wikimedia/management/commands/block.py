@@ -5,8 +5,7 @@ import sys
 from typing import Any
 from django.core.management.base import BaseCommand, CommandParser
 
-import bituldap
-
+from ldapbackend import directory
 from wikimedia.integrations.phabricator import PhabClient
 
 logger = logging.getLogger('bitu')
@@ -41,7 +40,7 @@ class Command(BaseCommand):
 
     def handle(self, *args: Any, **options: Any):
         uid = options['uid']
-        entry  = bituldap.get_user(uid)
+        entry  = directory.get_user(uid)
         if not entry:
             self.stdout.write(
                 self.style.ERROR_OUTPUT(f'No user with uid: {uid} found in LDAP')
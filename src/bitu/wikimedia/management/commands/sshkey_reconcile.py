@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+
+import bituldap
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+from django.db.models.functions import Lower
+from ldap3 import SUBTREE
+
+from keymanagement.models import SSHKey
+from ldapbackend import pool, sshkeys
+
+logger = logging.getLogger('bitu')
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Reconcile SSH keys in Bitu with LDAP, for all users"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--dry-run',
+            '-d',
+            action='store_true',
+            help='Dry-Run, report drift only'
+        )
+        parser.add_argument('--chunk-size',
+                            type=int,
+                            default=500,
+                            help='Number of LDAP users compared per database query'
+                            )
+        parser.add_argument('--workers',
+                            type=int,
+                            default=4,
+                            help='Number of chunks processed in parallel, 1 disables the worker pool'
+                            )
+
+    def stream_ldap_users(self, chunk_size: int) -> Iterator[list[tuple[str, list[bytes]]]]:
+        """Yield chunks of (uid, sshPublicKey values) for all LDAP users with SSH keys,
+        using a paged search, so that only one page is held in memory at a time."""
+        config = bituldap.read_configuration()
+        bound, ldap = bituldap.create_connection()
+        if not bound:
+            raise RuntimeError('unable to bind to ldap')
+
+        results = ldap.extend.standard.paged_search(
+            config.users.dn, '(sshPublicKey=*)', SUBTREE,
+            attributes=['uid', 'sshPublicKey'],
+            paged_size=chunk_size, generator=True)
+
+        chunk = []
+        for result in results:
+            if result.get('type') != 'searchResEntry':
+                continue
+
+            attributes = result['raw_attributes']
+            uid = attributes['uid'][0].decode('utf8')
+            chunk.append((uid, list(attributes.get('sshPublicKey', []))))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def process_chunk(self, chunk: list[tuple[str, list[bytes]]], dry_run: bool) -> Counter:
+        stats: Counter = Counter()
+        # uid is case insensitive in LDAP, match usernames regardless of case.
+        users = {u.get_username().lower(): u for u in User.objects.annotate(username_lower=Lower('username'))
+                 .filter(username_lower__in=[uid.lower() for uid, _ in chunk])}
+
+        # Load the keys of all users in the chunk with a single query.
+        keys: dict[int, list[SSHKey]] = {u.pk: [] for u in users.values()}
+        for key in SSHKey.objects.filter(user__in=users.values()):
+            keys[key.user_id].append(key)
+
+        for uid, values in chunk:
+            stats['users'] += 1
+            user = users.get(uid.lower())
+            if user is None:
+                stats['no_account'] += 1
+                continue
+            self.reconcile_user(user, sshkeys.compare(keys[user.pk], values), dry_run, stats)
+        return stats
+
+    def reconcile_user(self, user, diff: sshkeys.SSHKeyDiff, dry_run: bool, stats: Counter) -> None:
+        if not diff.changed:
+            return
+
+        stats['drifted'] += 1
+        stats['imported'] += len(diff.imported)
+        stats['reactivated'] += len(diff.reactivated)
+        stats['deactivated'] += len(diff.deactivated)
+
+        if dry_run:
+            self.stdout.write(f'{user.get_username()}: {diff}')
+            return
+
+        try:
+            sshkeys.reconcile(user)
+        except Exception as e:
+            stats['errors'] += 1
+            logger.error(f'ssh key reconciliation failed, user: {user.get_username()}, exception: {e}')
+            self.stderr.write(f'{user.get_username()}: {e}')
+
+    def handle(self, *args: Any, **options: Any):
+        dry_run = options.get('dry_run', False)
+        if dry_run:
+            self.stdout.write("======================== DRY-RUN ========================")
+
+        started = time.monotonic()
+        totals: Counter = Counter()
+        seen: set[str] = set()
+        lock = threading.Lock()
+
+        def run(chunk):
+            try:
+                stats = self.process_chunk(chunk, dry_run)
+                with lock:
+                    totals.update(stats)
+            finally:
+                # Worker threads hold their own database and LDAP connections.
+                connection.close()
+                pool.release_connection()
+
+        if options['workers'] <= 1:
+            for chunk in self.stream_ldap_users(options['chunk_size']):
+                seen.update(uid.lower() for uid, _ in chunk)
+                totals.update(self.process_chunk(chunk, dry_run))
+        else:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                futures = []
+                for chunk in self.stream_ldap_users(options['chunk_size']):
+                    seen.update(uid.lower() for uid, _ in chunk)
+                    futures.append(executor.submit(run, chunk))
+
+                    # Bound the number of chunks waiting for a worker.
+                    if len(futures) >= options['workers'] * 2:
+                        futures.pop(0).result()
+                for future in futures:
+                    future.result()
+
+        # Users with active keys in Bitu, but none in LDAP, are not part of the search.
+        users = User.objects.filter(ssh_keys__system=sshkeys.system, ssh_keys__active=True).distinct()
+        for user in users.iterator():
+            if user.get_username().lower() in seen:
+                continue
+            totals['users'] += 1
+            keys = list(user.ssh_keys.all())
+            self.reconcile_user(user, sshkeys.compare(keys, []), dry_run, totals)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"users: {totals['users']}, without account: {totals['no_account']}, "
+            f"drifted: {totals['drifted']}, imported: {totals['imported']}, "
+            f"reactivated: {totals['reactivated']}, deactivated: {totals['deactivated']}, "
+            f"errors: {totals['errors']}, "
+            f"elapsed: {elapsed:.1f}s, throughput: {totals['users'] / elapsed if elapsed else 0:.0f} users/s")
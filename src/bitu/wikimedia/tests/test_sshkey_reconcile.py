@@ -0,0 +1,48 @@
+from io import StringIO
+from unittest.mock import patch
+
+import bituldap
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from keymanagement.helpers import ssh_key_finger_print
+from keymanagement.models import SSHKey
+from ldapbackend import sshkeys
+from ldapbackend.tests import dummy_ldap
+from wikimedia.management.commands.sshkey_reconcile import Command
+
+User = get_user_model()
+
+
+class SSHKeyReconcileTest(TestCase):
+    test_key = "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIOxNideuQLvciH5ssbXrJAGUW4oPNVOcBJ/RlLQ5CEOI Bitu test key 2"  # noqa: E501 line too long
+
+    @patch("bituldap.create_connection", return_value=dummy_ldap.connect())
+    def test_reconcile_command(self, mock_connect):
+        user, _ = User.objects.get_or_create(username='ahall')
+        ldap = bituldap.get_user(user.get_username())
+        self.assertEqual(sshkeys.compare([], ldap.sshPublicKey.values).imported, [
+            ssh_key_finger_print(v.decode('utf8')) for v in ldap.sshPublicKey.values])
+
+        out = StringIO()
+        call_command('sshkey_reconcile', '--dry-run', '--workers=1', stdout=out)
+        self.assertIn('ahall:', out.getvalue())
+        self.assertFalse(SSHKey.objects.filter(user=user).exists())
+
+        call_command('sshkey_reconcile', '--workers=1', stdout=StringIO())
+        self.assertFalse(sshkeys.compare(list(user.ssh_keys.all()), ldap.sshPublicKey.values).changed)
+
+    def test_username_case(self):
+        user, _ = User.objects.get_or_create(username='BNoble')
+        key = SSHKey(user=user, ssh_public_key=self.test_key, system='ldapbackend', active=True)
+        key._skip_signal = True
+        key.save()
+
+        # LDAP returns the uid in lower case, the user must still be compared.
+        out = StringIO()
+        stats = Command(stdout=out).process_chunk([('bnoble', [])], dry_run=True)
+        self.assertEqual(stats['no_account'], 0)
+        self.assertEqual(stats['deactivated'], 1)
+        self.assertIn('BNoble:', out.getvalue())
@@ -1,7 +1,7 @@
 import logging
 
 
-import bituldap
+from ldapbackend import directory
 
 from django.conf import settings
 from django.http import HttpRequest
@@ -52,7 +52,7 @@ def wikimedia_global_account(request: HttpRequest) -> bool:
     if request.session.get('wikimedia_global', False):
         return True
 
-    ldap_user = bituldap.get_user(request.user.get_username())
+    ldap_user = directory.get_user(request.user.get_username())
     if not ldap_user:
         logger.warning(f'wikimedia global account validation failure, error getting ldap user: {request.user.get_username()}')
         return True
@@ -106,7 +106,7 @@ def phabricator_account(request: HttpRequest) -> bool:
     if request.session.get('phabricator_account', False):
         return True
 
-    ldap_user = bituldap.get_user(request.user.get_username())
+    ldap_user = directory.get_user(request.user.get_username())
     if not ldap_user:
         logger.warning(f'wikimedia global account validation failure, error getting ldap user: {request.user.get_username()}')
         return True
@@ -18,6 +18,8 @@ from django.views.generic.edit import CreateView
 from django.views.generic.list import ListView
 from passlib.hash import ldap_salted_sha1 as lsm
 
+from ldapbackend import directory
+
 from . import jobs
 from .forms import (BlockUserSearchForm,
                     ForgotUsernameForm,
@@ -104,14 +106,14 @@ class PasswordResetView(FormView):
         try:
             # urlsafe_base64_decode() decodes to bytestring
             uid = urlsafe_base64_decode(uidb64).decode()
-            user = bituldap.get_user(uid)
+            user = directory.get_user(uid, writable=True)
         except:
             user = None
         return user
 
     def form_valid(self, form):
         self.user.userPassword = lsm.hash(form.cleaned_data['password1'])
-        self.user.entry_commit_changes()
+        directory.commit(self.user)
         del self.request.session[INTERNAL_RESET_SESSION_TOKEN]
         return super().form_valid(form)
 
@@ -198,7 +200,7 @@ class BlockUserView(AccountManagersPermissionMixin, CreateView):
         return initial
 
     def form_valid(self, form: Any) -> HttpResponse:
-        user = bituldap.get_user(self.kwargs['username'])
+        user = directory.get_user(self.kwargs['username'])
         unset_email = False
         if form.is_valid():
             if form.cleaned_data['created_by'] != self.request.user.get_username():